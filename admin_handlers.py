@@ -1,10 +1,15 @@
+import asyncio
+import hashlib
+import html
 import logging
-import random
 import datetime
-from user_handlers import send_reminder_after_pairing
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+import re
+from collections import Counter
 from aiogram import Router, Bot, F
-from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import (
     Message,
     CallbackQuery,
@@ -12,42 +17,91 @@ from aiogram.types import (
     InlineKeyboardButton,
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.utils.markdown import hbold, hitalic, hcode
+from aiogram.utils.markdown import hbold, hitalic
+from apscheduler.triggers.cron import CronTrigger
 
+import broadcast
 import db
-from config import ADMIN_IDS
+import export
+import forecast
+import metrics
+import sender
+import templates
+from config import (
+    ADMIN_IDS,
+    MATCH_AVOID_SAME_DEPARTMENT,
+    MATCH_HISTORY_WEEKS,
+    MATCH_SEED,
+    MATCH_TRIADS,
+    REMINDER_DELAY_DAYS,
+    SCHEDULE_DAY,
+    SCHEDULE_HOUR,
+    SCHEDULE_MINUTE,
+    SCHEDULE_TIMEZONE,
+    SEND_RATE,
+)
+from matching import Matching, build_history, match_users
 
-admin_router = Router()
-awaiting_actions = {}  # user_id: action_type
+admin_router = Router(name="admin")
+# Весь роутер только для админов: обычные апдейты отсекаются одной проверкой
+# по frozenset и не доходят до обработчиков админки
+admin_router.message.filter(F.from_user.id.in_(ADMIN_IDS))
+admin_router.callback_query.filter(F.from_user.id.in_(ADMIN_IDS))
 
-# Scheduler for reminders
-from zoneinfo import ZoneInfo
 
-scheduler = AsyncIOScheduler(timezone=ZoneInfo("Europe/Moscow"))
-scheduler.start()
+class AdminStates(StatesGroup):
+    """Ожидание ввода от админа (хранится в FSM вместе с регистрацией)."""
 
-# --- helpers for long outputs ---
+    broadcast = State()
+    test_broadcast = State()
+    # в данных состояния: delete_query — последний поисковый запрос
+    delete_search = State()
 
 
-def chunk_list(lst, size):
-    """Yield successive chunks from list with max length `size`."""
-    for i in range(0, len(lst), size):
-        yield lst[i : i + size]
+# Ввод админа в состоянии: команды (/help, /start…) не считаются вводом и
+# уходят своим обработчикам, а не в рассылку или поиск
+NOT_COMMAND = ~F.text.startswith("/")
 
 
-def split_text_by_limit(lines, header="", limit=4000):
-    """Split a list of text lines into chunks respecting Telegram 4096 char limit."""
-    chunks = []
-    current = header
-    for line in lines:
-        if len(current) + len(line) + 1 > limit:
-            chunks.append(current)
-            current = header + line + "\n"
-        else:
-            current += line + "\n"
-    if current:
-        chunks.append(current)
-    return chunks
+async def enter_admin_state(
+    call: CallbackQuery, state: FSMContext, new_state: State
+) -> bool:
+    """
+    Перейти в ожидание ввода админа. Состояние общее с регистрацией: если админ
+    сейчас регистрируется, действие не начинается, чтобы не потерять его данные.
+    """
+    current = await state.get_state()
+    if current is not None and current not in AdminStates:
+        await call.answer(
+            "Сначала завершите или отмените регистрацию в боте.", show_alert=True
+        )
+        return False
+    await state.set_state(new_state)
+    return True
+
+
+async def clear_admin_state(state: FSMContext):
+    """Сбросить ожидание ввода админа, не трогая чужие состояния (регистрацию)."""
+    if await state.get_state() in AdminStates:
+        await state.clear()
+
+
+# Сколько крупнейших отделов показывать кнопками в меню экспорта
+EXPORT_MAX_DEPARTMENTS = 10
+# Участников на одной странице списка
+LIST_PAGE_SIZE = 20
+# Кнопок с найденными участниками на одной странице поиска для удаления
+SEARCH_PAGE_SIZE = 8
+# На сколько недель вперёд статистика прогнозирует размер раундов
+STATS_FORECAST_WEEKS = 4
+# Горизонт подробного прогноза нагрузки (/forecast)
+FORECAST_WEEKS = 8
+# Сколько крупнейших отделов показывать в сводке плана жеребьевки
+PLAN_TOP_DEPARTMENTS = 5
+# Имя когорты идёт в deep link (t.me/<bot>?start=<name>)
+COHORT_NAME_RE = re.compile(r"[A-Za-z0-9_-]{1,32}")
+# Id задач плановых раундов в планировщике: pairing:<day>:<hour>:<minute>
+PAIRING_JOB_PREFIX = "pairing:"
 
 
 def get_admin_keyboard():
@@ -72,184 +126,383 @@ def get_admin_keyboard():
     builder.row(
         InlineKeyboardButton(
             text="🗑 Удалить пользователя", callback_data="admin_delete_user"
-        )
+        ),
+        InlineKeyboardButton(text="🏢 Когорты", callback_data="admin_cohorts"),
     )
     return builder.as_markup()
 
 
 @admin_router.message(Command("admin"))
 async def cmd_admin_menu(message: Message):
-    if message.from_user.id not in ADMIN_IDS:
-        await message.answer("⛔ Доступ запрещен")
-        return
-
     text = f"{hbold('🔧 Панель администратора')}\n\n" "Выберите действие из меню ниже:"
     await message.answer(text, reply_markup=get_admin_keyboard())
 
 
-async def pair_users(bot: Bot, force_all: bool = False, include_active_also: bool = False) -> dict:
+async def plan_round(
+    force_all: bool = False,
+    seed: int = MATCH_SEED,
+    cohort_id: int = db.DEFAULT_COHORT_ID,
+) -> Matching:
+    """
+    Фаза 1: выбрать участников когорты и подобрать группы с учётом истории
+    встреч, ничего не отправляя и не сохраняя. Меньше двух участников — пустой Matching.
+    """
+    # When forcing pairing from admin panel, explicitly request only active users
+    users = (
+        await db.get_all_users(include_inactive=False, cohort_id=cohort_id)
+        if force_all
+        else await db.get_eligible_users(cohort_id)
+    )
+    if len(users) < 2:
+        return Matching()
+
+    # Подбираем пары, избегая повторов с прошлыми партнерами; оставшиеся
+    # без пары в прошлый раз распределяются первыми
+    history = build_history(await db.get_pair_history(MATCH_HISTORY_WEEKS, cohort_id))
+    return match_users(
+        users,
+        history,
+        avoid_same_department=MATCH_AVOID_SAME_DEPARTMENT,
+        seed=seed,
+        triads=MATCH_TRIADS,
+        priority=await db.get_left_out_ids(cohort_id),
+    )
+
+
+async def dispatch_round(
+    bot: Bot,
+    matching: Matching,
+    forced: bool = False,
+    cohort_id: int = db.DEFAULT_COHORT_ID,
+) -> dict:
     """
-    Формирует пары пользователей
+    Фаза 2: разослать уведомления по готовому подбору и сохранить раунд.
     Возвращает словарь с результатами:
     {
-        "pairs_count": int,
+        "pairs_count": int,  # все группы, включая группы из трёх
+        "triads_count": int,
         "users_paired": int,
         "users_without_pair": int,
-        "failed_to_notify": list
+        "repeat_pairs": int,
+        "failed_to_notify": list,
+        "round_id": int | None
     }
     """
-    # When forcing pairing from admin panel, explicitly request only active users
-    users = db.get_all_users(include_inactive=False) if force_all else db.get_eligible_users()
     result = {
         "pairs_count": 0,
+        "triads_count": 0,
         "users_paired": 0,
         "users_without_pair": 0,
+        "repeat_pairs": matching.repeats,
         "failed_to_notify": [],
+        "round_id": None,
     }
-
-    if len(users) < 2:
+    if not matching.groups:
         return result
 
-    random.shuffle(users)
-    paired_ids = []
-
-    # Формируем пары
-    for i in range(0, len(users) - (len(users) % 2), 2):
-        # Получаем все поля для первого пользователя
-        user1 = users[i]
-        uid1 = user1[0]
-        uname1 = user1[1]
-        name1 = user1[2] if len(user1) > 2 else "Неизвестно"
-
-        # Получаем все поля для второго пользователя
-        user2 = users[i + 1]
-        uid2 = user2[0]
-        uname2 = user2[1]
-        name2 = user2[2] if len(user2) > 2 else "Неизвестно"
-
-        # Обработка username для корректной передачи в напоминание (без @, не пустой)
-        uname1_clean = uname1.lstrip("@") if uname1 else ""
-        uname2_clean = uname2.lstrip("@") if uname2 else ""
-
-        position2 = user2[3] if len(user2) > 3 and user2[3] else "не указан"
-        department2 = user2[4] if len(user2) > 4 and user2[4] else "не указан"
-        if uname2:
-            contact2 = f"📱 {hbold('Контакты:')} @{uname2}\n"
-        else:
-            contact2 = "📱 (нет username)\n"
-        partner_msg_1 = (
-            f"☕ {hbold('Новый партнер для Random Coffee!')}\n\n"
-            f"👤 {hbold('Имя:')} {name2}\n"
-            f"💼 {hbold('Должность:')} {position2}\n"
-            f"🏢 {hbold('Отдел:')} {department2}\n"
-            f"{contact2}\n"
-            "Теперь ты можешь написать своему партнеру и договориться о встрече на этой неделе."
-        )
-
-        position1 = user1[3] if len(user1) > 3 and user1[3] else "не указан"
-        department1 = user1[4] if len(user1) > 4 and user1[4] else "не указан"
-        if uname1:
-            contact1 = f"📱 {hbold('Контакты:')} @{uname1}\n"
-        else:
-            contact1 = "📱 (нет username)\n"
-        partner_msg_2 = (
-            f"☕ {hbold('Новый партнер для Random Coffee!')}\n\n"
-            f"👤 {hbold('Имя:')} {name1}\n"
-            f"💼 {hbold('Должность:')} {position1}\n"
-            f"🏢 {hbold('Отдел:')} {department1}\n"
-            f"{contact1}\n"
-            "Теперь ты можешь написать своему партнеру и договориться о встрече на этой неделе."
-        )
-
-        success = True
-        try:
-            await bot.send_message(uid1, partner_msg_1)
-            await bot.send_message(uid2, partner_msg_2)
-            # Запланировать напоминание через 3 дня
-            run_date = datetime.datetime.now(
-                ZoneInfo("Europe/Moscow")
-            ) + datetime.timedelta(days=3)
-            scheduler.add_job(
-                send_reminder_after_pairing,
-                trigger="date",
-                run_date=run_date,
-                args=[uid1, name2, uname2_clean, bot],
-            )
-            scheduler.add_job(
-                send_reminder_after_pairing,
-                trigger="date",
-                run_date=run_date,
-                args=[uid2, name1, uname1_clean, bot],
-            )
-        except Exception as e:
-            logging.error(f"Failed to notify pair {uid1} and {uid2}: {e}")
-            result["failed_to_notify"].extend([uid1, uid2])
-            success = False
+    deliveries = []
 
-        if success:
-            paired_ids.extend([uid1, uid2])
-            result["pairs_count"] += 1
-            result["users_paired"] += 2
+    # Формируем пары и группы из трёх
+    for group in matching.groups:
+        for member in group:
+            others = [other for other in group if other is not member]
+            text = (
+                templates.partner_message(others[0])
+                if len(others) == 1
+                else templates.group_message(others)
+            )
+            deliveries.append(sender.message(bot, member[0], text))
 
     # Обработка пользователя без пары
-    if len(users) % 2 == 1:
-        user = users[-1]
-        uid = user[0]
-        uname = user[1]
-        name = user[2] if len(user) > 2 else "Неизвестно"
-
+    no_pair = templates.render("no_pair")
+    for user in matching.leftover:
         result["users_without_pair"] += 1
-
-        msg = (
-            f"☕ {hbold('Random Coffee')}\n\n"
-            "В этом раунде не нашлось для вас пары, потому что количество участников оказалось нечетным.\n"
-            "В следующий раз обязательно найдём вам собеседника!"
+        deliveries.append(sender.message(bot, user[0], no_pair))
+
+    # Все уведомления уходят параллельно через общий ограничитель скорости
+    delivered = await sender.sender.deliver(deliveries)
+    failed = {chat_id for chat_id, res in delivered.items() if not res.ok}
+    result["failed_to_notify"].extend(sorted(failed))
+
+    # Группа сохраняется, если уведомление получили хотя бы двое её участников
+    placed = []
+    for group in matching.groups:
+        ids = [member[0] for member in group]
+        members = tuple(uid for uid in ids if uid not in failed)
+        if len(members) < 2:
+            logging.error(f"Failed to notify group {ids}")
+            continue
+
+        placed.append(members)
+        result["pairs_count"] += 1
+        result["users_paired"] += len(members)
+        if len(members) == 3:
+            result["triads_count"] += 1
+
+    # Пары, даты участия и напоминания через N дней сохраняются одной транзакцией
+    if placed:
+        remind_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            days=REMINDER_DELAY_DAYS
+        )
+        result["round_id"] = await db.commit_round(
+            placed, forced=forced, remind_at=remind_at, cohort_id=cohort_id
         )
+    if matching.leftover:
+        await db.mark_left_out([user[0] for user in matching.leftover])
 
-        try:
-            await bot.send_message(uid, msg)
-        except Exception as e:
-            logging.error(f"Failed to notify user without pair {uid}: {e}")
-            result["failed_to_notify"].append(uid)
+    return result
 
-    if paired_ids:
-        db.update_last_participation(paired_ids)
 
-    return result
+async def pair_users(
+    bot: Bot,
+    force_all: bool = False,
+    include_active_also: bool = False,
+    seed: int = MATCH_SEED,
+    cohort_id: int = db.DEFAULT_COHORT_ID,
+) -> dict:
+    """
+    Подбор и рассылка в когорте за один шаг (плановый запуск по расписанию);
+    при нечётном количестве один участник попадает в группу из трёх.
+    Результат — как у dispatch_round.
+    """
+    matching = await plan_round(force_all, seed, cohort_id)
+    return await dispatch_round(bot, matching, forced=force_all, cohort_id=cohort_id)
+
+
+def cohort_schedule(cohort: dict) -> tuple:
+    """(day, hour, minute) планового раунда когорты; пустые поля — из config."""
+    return (
+        cohort["schedule_day"] or SCHEDULE_DAY,
+        SCHEDULE_HOUR if cohort["schedule_hour"] is None else cohort["schedule_hour"],
+        SCHEDULE_MINUTE if cohort["schedule_minute"] is None else cohort["schedule_minute"],
+    )
 
 
-async def pair_users_monday(bot: Bot):
+async def pair_cohort(bot: Bot, cohort_id: int) -> dict:
     """
-    Wrapper to be scheduled weekly from main.py.
-    Calls pair_users and logs a short summary.
+    Плановый раунд одной когорты. Раунд пропускается (пустой результат),
+    если с прошлого планового раунда прошло меньше frequency недель.
     """
-    logging.info("Weekly pairing job started.")
-    try:
-        result = await pair_users(bot, force_all=False)
+    cohort = await db.get_cohort(cohort_id)
+    if cohort is None:
+        return {}
+    last = cohort["last_round"]
+    if not db.cohort_round_due(last, cohort["frequency"], datetime.date.today()):
         logging.info(
-            f"Weekly pairing finished: pairs={result.get('pairs_count',0)}, "
-            f"paired={result.get('users_paired',0)}, without_pair={result.get('users_without_pair',0)}"
+            f"Cohort {cohort['name']}: skipped, last round {last}, "
+            f"every {cohort['frequency']} weeks"
         )
-    except Exception as e:
-        logging.exception(f"pair_users_monday failed: {e}")
+        return {}
+    result = await pair_users(bot, force_all=False, cohort_id=cohort_id)
+    logging.info(
+        f"Cohort {cohort['name']} pairing finished: pairs={result.get('pairs_count',0)}, "
+        f"paired={result.get('users_paired',0)}, without_pair={result.get('users_without_pair',0)}"
+    )
+    return result
 
 
-@admin_router.callback_query(F.data == "admin_pair_force")
+async def run_scheduled_rounds(bot: Bot, cohort_ids: list):
+    """
+    Job for cohorts sharing one schedule: their rounds run in parallel
+    (DB calls are serialized, deliveries share the sender's rate limit).
+    A failing cohort does not stop the others.
+    """
+    logging.info(f"Scheduled pairing started for cohorts {cohort_ids}.")
+    results = await asyncio.gather(
+        *(pair_cohort(bot, cohort_id) for cohort_id in cohort_ids),
+        return_exceptions=True,
+    )
+    for cohort_id, result in zip(cohort_ids, results):
+        if isinstance(result, Exception):
+            logging.error(
+                f"Pairing of cohort {cohort_id} failed", exc_info=result
+            )
+
+
+async def schedule_rounds(scheduler, bot: Bot) -> dict:
+    """
+    (Re)create scheduled pairing jobs: one cron job per distinct cohort schedule.
+    Returns {(day, hour, minute): [cohort ids]}.
+    """
+    by_schedule = {}
+    for cohort in await db.get_cohorts():
+        by_schedule.setdefault(cohort_schedule(cohort), []).append(cohort["id"])
+    for job in scheduler.get_jobs():
+        if job.id.startswith(PAIRING_JOB_PREFIX):
+            job.remove()
+    for (day, hour, minute), cohort_ids in by_schedule.items():
+        scheduler.add_job(
+            metrics.track_job(run_scheduled_rounds),
+            "cron",
+            args=[bot, cohort_ids],
+            day_of_week=day,
+            hour=hour,
+            minute=minute,
+            id=f"{PAIRING_JOB_PREFIX}{day}:{hour}:{minute}",
+            replace_existing=True,
+        )
+    return by_schedule
+
+
+def render_plan(plan_id: int, matching: Matching, cohort: dict) -> str:
+    """Короткая сводка плана жеребьёвки когорты для админа."""
+    placed = sum(len(group) for group in matching.groups)
+    triads = sum(1 for group in matching.groups if len(group) == 3)
+    same_department = sum(
+        1
+        for group in matching.groups
+        if len({(member[4] or "").strip().lower() for member in group}) < len(group)
+    )
+    departments = Counter(
+        member[4] or "—" for group in matching.groups for member in group
+    )
+    departments.update(member[4] or "—" for member in matching.leftover)
+
+    text = (
+        f"{hbold(f'📋 План жеребьевки #{plan_id}')}\n\n"
+        f"• Когорта: {html.escape(cohort['name'])}\n"
+        f"• Участников: {placed + len(matching.leftover)}\n"
+        f"• Пар: {len(matching.groups)} (из них втроём: {triads})\n"
+        f"• Без пары: {len(matching.leftover)}\n"
+        f"• Повторных пар: {matching.repeats}\n"
+        f"• Пар из одного отдела: {same_department}\n"
+    )
+    if departments:
+        top = ", ".join(
+            f"{html.escape(name)}: {count}"
+            for name, count in departments.most_common(PLAN_TOP_DEPARTMENTS)
+        )
+        others = len(departments) - PLAN_TOP_DEPARTMENTS
+        if others > 0:
+            top += f" и ещё {others}"
+        text += f"• Отделы: {top}\n"
+    text += f"\n{hitalic('Сообщения ещё не отправлены.')}"
+    return text
+
+
+def get_plan_keyboard(plan_id: int, cohort_id: int):
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text="✅ Разослать", callback_data=f"admin_plan_commit:{plan_id}"
+        ),
+        InlineKeyboardButton(
+            text="🔄 Пересчитать", callback_data=f"admin_pair_force:{cohort_id}"
+        ),
+    )
+    builder.row(
+        InlineKeyboardButton(
+            text="❌ Отменить", callback_data=f"admin_plan_cancel:{plan_id}"
+        )
+    )
+    return builder.as_markup()
+
+
+@admin_router.callback_query(
+    (F.data == "admin_pair_force") | F.data.startswith("admin_pair_force:")
+)
 async def on_admin_pair_force(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
+    if call.data == "admin_pair_force":
+        cohorts = await db.get_cohorts()
+        if len(cohorts) > 1:
+            # Жеребьевка всегда в пределах одной когорты
+            builder = InlineKeyboardBuilder()
+            for cohort in cohorts:
+                builder.row(
+                    InlineKeyboardButton(
+                        text=f"{cohort['name']} ({cohort['active']})",
+                        callback_data=f"admin_pair_force:{cohort['id']}",
+                    )
+                )
+            builder.row(
+                InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")
+            )
+            await call.message.edit_text(
+                "🏢 Выберите когорту для жеребьевки:", reply_markup=builder.as_markup()
+            )
+            await call.answer()
+            return
+        cohort = cohorts[0]
+    else:
+        cohort = await db.get_cohort(int(call.data.split(":")[1]))
+        if cohort is None:
+            await call.answer("Когорта не найдена", show_alert=True)
+            return
+
+    # Сначала только план: рассылка — после подтверждения
+    await call.answer("⏳ Подбираем пары...")
+
+    matching = await plan_round(force_all=True, cohort_id=cohort["id"])
+    if not matching.groups:
+        await call.message.edit_text(
+            "⚠️ Не удалось сформировать пары. Недостаточно участников.",
+            reply_markup=get_admin_keyboard(),
+        )
         return
 
-    await call.answer("⏳ Формируем пары...")
+    plan_id = await db.save_plan(
+        [tuple(member[0] for member in group) for group in matching.groups],
+        [member[0] for member in matching.leftover],
+        repeats=matching.repeats,
+        forced=True,
+        admin_id=call.from_user.id,
+        cohort_id=cohort["id"],
+    )
+    await call.message.edit_text(
+        render_plan(plan_id, matching, cohort),
+        reply_markup=get_plan_keyboard(plan_id, cohort["id"]),
+    )
+
+
+@admin_router.callback_query(F.data.startswith("admin_plan_commit:"))
+async def on_admin_plan_commit(call: CallbackQuery):
+    plan_id = int(call.data.split(":")[1])
+    plan = await db.claim_plan(plan_id)
+    if plan is None:
+        await call.answer("План уже разослан или отменён", show_alert=True)
+        return
+    if plan["stale"]:
+        await call.answer(
+            "После этого плана уже прошла жеребьевка. Пересчитайте план.",
+            show_alert=True,
+        )
+        return
 
-    result = await pair_users(call.bot, force_all=True)
+    await call.answer("⏳ Рассылаем...")
+    await call.message.edit_reply_markup(reply_markup=None)
+
+    # Участники, ставшие неактивными после планирования, выпали из групп
+    matching = Matching(leftover=plan["leftover"], repeats=plan["repeats"])
+    for group in plan["groups"]:
+        if len(group) >= 2:
+            matching.groups.append(tuple(group))
+        else:
+            matching.leftover.extend(group)
+
+    try:
+        result = await dispatch_round(
+            call.bot, matching, forced=plan["forced"], cohort_id=plan["cohort_id"]
+        )
+    except Exception as e:
+        # Иначе план навсегда остался бы в 'dispatching'
+        logging.exception(f"Dispatch of plan {plan_id} failed: {e}")
+        await db.finish_plan(plan_id, "failed")
+        await call.message.edit_text(
+            f"❌ Не удалось разослать план #{plan_id}.\n"
+            "Часть уведомлений могла уйти. Проверьте логи и составьте план заново.",
+            reply_markup=get_admin_keyboard(),
+        )
+        return
+    await db.finish_plan(plan_id, "committed", result["round_id"])
 
     if result["pairs_count"] > 0:
         text = (
             f"{hbold('✅ Жеребьевка завершена!')}\n\n"
             f"• Создано пар: {result['pairs_count']}\n"
             f"• Участников с парой: {result['users_paired']}\n"
+            f"• Из них втроём: {result['triads_count']}\n"
             f"• Участников без пары: {result['users_without_pair']}\n"
+            f"• Повторных пар: {result['repeat_pairs']}\n"
         )
 
         if result["failed_to_notify"]:
@@ -263,13 +516,96 @@ async def on_admin_pair_force(call: CallbackQuery):
     )
 
 
-@admin_router.callback_query(F.data == "admin_broadcast")
-async def on_admin_broadcast(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
+@admin_router.callback_query(F.data.startswith("admin_plan_cancel:"))
+async def on_admin_plan_cancel(call: CallbackQuery):
+    plan_id = int(call.data.split(":")[1])
+    if not await db.finish_plan(plan_id, "cancelled"):
+        await call.answer("План уже разослан или отменён", show_alert=True)
+        return
+    await call.message.edit_text(
+        f"❌ План жеребьевки #{plan_id} отменён.", reply_markup=get_admin_keyboard()
+    )
+    await call.answer()
+
+
+async def render_cohorts(bot: Bot) -> str:
+    me = await bot.me()
+    text = f"{hbold('🏢 Когорты')}\n\n"
+    for cohort in await db.get_cohorts():
+        day, hour, minute = cohort_schedule(cohort)
+        every = (
+            "каждую неделю"
+            if cohort["frequency"] == 1
+            else f"раз в {cohort['frequency']} недель"
+        )
+        text += (
+            f"• {hbold(html.escape(cohort['name']))}: {day} {hour:02d}:{minute:02d}, {every}, "
+            f"активных: {cohort['active']}, последний раунд: {cohort['last_round'] or '—'}\n"
+            f"  https://t.me/{me.username}?start={cohort['name']}\n"
+        )
+    text += (
+        "\nУчастник попадает в когорту по ссылке. Добавить или изменить когорту:\n"
+        "/cohort_add &lt;имя&gt; [день HH:MM] [раз в N недель]\n"
+        f"{hitalic('Например: /cohort_add spb tue 11:30 2')}"
+    )
+    return text
+
+
+@admin_router.callback_query(F.data == "admin_cohorts")
+async def on_admin_cohorts(call: CallbackQuery):
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")]
+        ]
+    )
+    await call.message.edit_text(
+        await render_cohorts(call.bot),
+        reply_markup=keyboard,
+        disable_web_page_preview=True,
+    )
+    await call.answer()
+
+
+@admin_router.message(Command("cohort_add"))
+async def cmd_cohort_add(
+    message: Message, command: CommandObject, bot: Bot, scheduler=None
+):
+    # /cohort_add <name> [day HH:MM] [weeks]
+    args = (command.args or "").split()
+    usage = "Формат: /cohort_add &lt;имя&gt; [день HH:MM] [раз в N недель]"
+    if not args or not COHORT_NAME_RE.fullmatch(args[0]):
+        await message.answer(
+            f"{usage}\nИмя: латиница, цифры, «_» и «-», до 32 символов."
+        )
+        return
+    name, rest = args[0], args[1:]
+    day = hour = minute = None
+    frequency = 1
+    try:
+        if len(rest) >= 2:
+            day = rest[0].lower()
+            hour, minute = (int(part) for part in rest[1].split(":"))
+            # Та же проверка, что сделает планировщик
+            CronTrigger(day_of_week=day, hour=hour, minute=minute)
+            rest = rest[2:]
+        if rest:
+            frequency = int(rest[0])
+            if frequency < 1 or len(rest) > 1:
+                raise ValueError(frequency)
+    except ValueError:
+        await message.answer(usage)
         return
 
-    awaiting_actions[call.from_user.id] = "broadcast"
+    await db.save_cohort(name, day, hour, minute, frequency)
+    if scheduler is not None:
+        await schedule_rounds(scheduler, bot)
+    await message.answer(await render_cohorts(bot), disable_web_page_preview=True)
+
+
+@admin_router.callback_query(F.data == "admin_broadcast")
+async def on_admin_broadcast(call: CallbackQuery, state: FSMContext):
+    if not await enter_admin_state(call, state, AdminStates.broadcast):
+        return
 
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
@@ -292,13 +628,10 @@ async def on_admin_broadcast(call: CallbackQuery):
 
 
 @admin_router.callback_query(F.data == "admin_test_broadcast")
-async def on_admin_test_broadcast(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
+async def on_admin_test_broadcast(call: CallbackQuery, state: FSMContext):
+    if not await enter_admin_state(call, state, AdminStates.test_broadcast):
         return
 
-    awaiting_actions[call.from_user.id] = "test_broadcast"
-
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -319,45 +652,75 @@ async def on_admin_test_broadcast(call: CallbackQuery):
     await call.answer()
 
 
-@admin_router.callback_query(F.data == "admin_list")
+def get_list_keyboard(rows, has_prev: bool, has_next: bool):
+    builder = InlineKeyboardBuilder()
+    navigation = []
+    if has_prev:
+        navigation.append(
+            InlineKeyboardButton(
+                text="◀️ Назад", callback_data=f"admin_list:prev:{rows[0][0]}"
+            )
+        )
+    if has_next:
+        navigation.append(
+            InlineKeyboardButton(
+                text="Вперёд ▶️", callback_data=f"admin_list:next:{rows[-1][0]}"
+            )
+        )
+    if navigation:
+        builder.row(*navigation)
+    builder.row(
+        InlineKeyboardButton(text="📥 Экспорт в CSV", callback_data="admin_export_csv")
+    )
+    builder.row(
+        InlineKeyboardButton(text="🔙 В меню", callback_data="admin_back_to_menu")
+    )
+    return builder.as_markup()
+
+
+@admin_router.callback_query(
+    (F.data == "admin_list") | F.data.startswith("admin_list:")
+)
 async def on_admin_list(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
-        return
+    await call.answer()
 
-    await call.answer("⏳ Загружаем список участников...")
+    # admin_list[:next|prev:<user_id>] — ключ страницы (full_name, user_id) участника
+    after = before = None
+    if call.data != "admin_list":
+        _, direction, user_id = call.data.split(":")
+        if direction == "next":
+            after = int(user_id)
+        else:
+            before = int(user_id)
 
-    eligible = {u[0] for u in db.get_eligible_users()}
-    active = {u[0] for u in db.get_all_active_users()}
-    cur = db.conn.execute(
-        "SELECT user_id, username, full_name, frequency, last_participation FROM participants ORDER BY full_name"
+    rows, has_prev, has_next = await db.get_participants_page(
+        LIST_PAGE_SIZE, after=after, before=before
     )
-    rows = cur.fetchall()
-    cur.close()
+    if not rows and (after or before):
+        # Участник-якорь удалён — начнём с первой страницы
+        rows, has_prev, has_next = await db.get_participants_page(LIST_PAGE_SIZE)
 
     if not rows:
-        await call.message.answer("ℹ️ Пока нет зарегистрированных участников.")
+        await call.message.edit_text(
+            "ℹ️ Пока нет зарегистрированных участников.",
+            reply_markup=get_list_keyboard(rows, False, False),
+        )
         return
 
-    total = len(rows)
-    active_count = sum(1 for row in rows if row[0] in active)
-    eligible_count = sum(1 for row in rows if row[0] in eligible)
-
-    header = (
+    stats = await db.get_user_stats()
+    text = (
         f"{hbold('👥 Участники Random Coffee')}\n\n"
-        f"• Всего участников: {total}\n"
-        f"• Активных: {active_count}\n"
-        f"• Готовых к жеребьевке: {eligible_count}\n"
-        f"• Неактивных: {total - active_count}\n\n"
+        f"• Всего участников: {stats['total']}\n"
+        f"• Активных: {stats['active']}\n"
+        f"• Готовых к жеребьевке: {stats['eligible']}\n"
+        f"• Неактивных: {stats['total'] - stats['active']}\n\n"
     )
 
-    # Сформируем строки списка для ВСЕХ пользователей
-    lines = []
     for row in rows:
-        user_id, username, full_name, frequency, last_participation = row
-        if user_id in eligible:
+        user_id, username, full_name, frequency, last_participation, active, eligible = row
+        if eligible:
             status = "✅"
-        elif user_id in active:
+        elif active:
             status = "☑️"  # активен, но не eligible по дате/частоте
         else:
             status = "⏸"
@@ -366,121 +729,246 @@ async def on_admin_list(call: CallbackQuery):
             f", последний раз: {last_participation}" if last_participation else ""
         )
         freq_part = f", раз в {frequency} недель" if frequency is not None else ""
-        lines.append(f"{status} {full_name} ({username_display}){freq_part}{last_part}")
-
-    # Разобьём вывод на несколько сообщений, чтобы показать всех
-    chunks = split_text_by_limit(lines, header=header, limit=4000)
-
-    # Перепишем исходное сообщение шапкой и первой порцией (если поместится)
-    if chunks:
-        await call.message.edit_text(chunks[0])
-        # Остальные части отправим отдельными сообщениями
-        for part in chunks[1:]:
-            await call.message.answer(part)
+        text += f"{status} {full_name} ({username_display}){freq_part}{last_part}\n"
 
-    # Кнопки действий отдельным сообщением
-    keyboard = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="📥 Экспорт в CSV", callback_data="admin_export_csv"
-                )
-            ],
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")],
-        ]
+    await call.message.edit_text(
+        text, reply_markup=get_list_keyboard(rows, has_prev, has_next)
     )
-    await call.message.answer("Выберите действие:", reply_markup=keyboard)
 
 
 @admin_router.callback_query(F.data == "admin_stats")
 async def on_admin_stats(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
-        return
-
-    await call.answer("⏳ Собираем статистику...")
-
-    # Общая статистика
-    total_users = db.conn.execute("SELECT COUNT(*) FROM participants").fetchone()[0]
-    active_users = len(db.get_eligible_users())
+    await call.answer()
 
-    # Статистика по участию
-    participation_stats = db.conn.execute(
-        "SELECT last_participation, COUNT(*) FROM participants "
-        "WHERE last_participation IS NOT NULL "
-        "GROUP BY last_participation ORDER BY last_participation DESC LIMIT 5"
-    ).fetchall()
+    stats = await db.get_user_stats(recent_dates=5)
+    total_users = stats["total"]
 
     text = (
         f"{hbold('📊 Статистика Random Coffee')}\n\n"
         f"• Всего участников: {total_users}\n"
-        f"• Активных: {active_users}\n"
-        f"• Неактивных: {total_users - active_users}\n\n"
+        f"• Активных: {stats['active']}\n"
+        f"• Неактивных: {total_users - stats['active']}\n"
+        f"• Готовы к подбору: {stats['eligible']}\n"
+        f"• Ещё не участвовали: {stats['never_participated']}\n"
+        f"• Заблокировали бота: {stats['suppressed']}\n\n"
         f"{hbold('Последние участия:')}\n"
     )
 
-    for date, count in participation_stats:
+    for date, count in stats["recent_participation"].items():
         text += f"• {date}: {count} участников\n"
 
-    # Статистика по частоте
-    freq_stats = db.conn.execute(
-        "SELECT frequency, COUNT(*) FROM participants GROUP BY frequency ORDER BY frequency"
-    ).fetchall()
-
     text += f"\n{hbold('Частота участия:')}\n"
-    for freq, count in freq_stats:
+    for freq, count in stats["frequency_distribution"].items():
         text += f"• Раз в {freq} недель: {count} участников\n"
 
+    # Тот же прогноз, что и в /forecast: каждая когорта по своему расписанию
+    text += f"\n{hbold('Прогноз раундов (все готовые участвуют):')}\n"
+    for row in await round_forecast(STATS_FORECAST_WEEKS):
+        text += (
+            f"• Неделя с {row.start:%d.%m}: ~{row.eligible} участников, "
+            f"~{row.placed // 2} пар\n"
+        )
+
+    profiles = db.profile_cache
+    text += (
+        f"\n{hbold('Кэш профилей:')}\n"
+        f"• Попаданий: {profiles.hits}, промахов: {profiles.misses}, "
+        f"записей: {len(profiles)}\n"
+    )
+
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="🔄 Обновить", callback_data="admin_stats")],
+            [
+                InlineKeyboardButton(text="🔄 Обновить", callback_data="admin_stats"),
+                InlineKeyboardButton(text="📈 Прогноз", callback_data="admin_forecast"),
+            ],
             [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")],
         ]
     )
 
-    await call.message.edit_text(text, reply_markup=keyboard)
+    try:
+        await call.message.edit_text(text, reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # «Обновить» без изменений в статистике
+        if "message is not modified" not in str(e):
+            raise
+
+
+def next_round_date(cohort: dict) -> datetime.date:
+    """Дата ближайшего планового раунда когорты по её расписанию."""
+    day, hour, minute = cohort_schedule(cohort)
+    trigger = CronTrigger(
+        day_of_week=day, hour=hour, minute=minute, timezone=SCHEDULE_TIMEZONE
+    )
+    now = datetime.datetime.now(SCHEDULE_TIMEZONE)
+    return trigger.get_next_fire_time(None, now).date()
 
 
-@admin_router.callback_query(F.data == "admin_export_csv")
-async def on_admin_export_csv(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
-        return
+async def round_forecast(weeks: int) -> list:
+    """
+    Прогноз по неделям для всех когорт по их расписаниям (forecast.WeekForecast).
+    Кэшируется вместе со статистикой: обновление экрана не пересчитывает его,
+    записи участников и изменения когорт сбрасывают кэш.
+    """
+    key = ("forecast", datetime.date.today().isoformat(), weeks)
+    rows = db.stats_cache.get(key)
+    if rows is None:
+        generation = db.stats_cache.generation
+        cohorts = await db.get_cohorts()
+        first_runs = {cohort["id"]: next_round_date(cohort) for cohort in cohorts}
+        rows = await forecast.build_forecast(cohorts, first_runs, weeks)
+        db.stats_cache.set(key, rows, generation)
+    return rows
+
+
+async def render_forecast() -> str:
+    rows = await round_forecast(FORECAST_WEEKS)
+    busiest = max(rows, key=lambda row: row.messages)
+    title = f"📈 Прогноз на {FORECAST_WEEKS} недель"
+    return (
+        f"{hbold(title)}\n\n"
+        f"<pre>{forecast.render_table(rows)}</pre>\n"
+        "Раунд — участники жеребьевок недели (все когорты, по их расписанию).\n"
+        f"Сообщ. — результаты жеребьевки, напоминания через {REMINDER_DELAY_DAYS} дн. "
+        "и еженедельная рассылка активным.\n"
+        "Напом. — напоминаний встанет в очередь.\n"
+        f"Время — доставка результатов при {SEND_RATE:g} сообщ./с.\n\n"
+        f"Пиковая неделя {busiest.start:%d.%m}: {busiest.messages} сообщений, "
+        f"~{forecast.format_duration(busiest.messages / SEND_RATE)} отправки."
+    )
 
-    await call.answer("⏳ Подготавливаем данные...")
 
-    cur = db.conn.execute(
-        "SELECT user_id, username, full_name, position, department, frequency, last_participation "
-        "FROM participants ORDER BY full_name"
+def get_forecast_keyboard():
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🔄 Обновить", callback_data="admin_forecast")],
+            [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_stats")],
+        ]
     )
-    rows = cur.fetchall()
-    cur.close()
 
-    if not rows:
-        await call.answer("ℹ️ Нет данных для экспорта", show_alert=True)
-        return
 
-    # Формируем CSV
-    csv_content = (
-        "ID;Username;Full Name;Position;Department;Frequency;Last Participation\n"
+@admin_router.message(Command("forecast"))
+async def cmd_forecast(message: Message):
+    await message.answer(await render_forecast(), reply_markup=get_forecast_keyboard())
+
+
+@admin_router.callback_query(F.data == "admin_forecast")
+async def on_admin_forecast(call: CallbackQuery):
+    try:
+        await call.message.edit_text(
+            await render_forecast(), reply_markup=get_forecast_keyboard()
+        )
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+    await call.answer()
+
+
+def department_key(department: str) -> str:
+    """
+    Стабильный ключ отдела для callback_data: не зависит от порядка списка,
+    поэтому изменения в отделах между показом меню и нажатием не подменят выгрузку.
+    """
+    return hashlib.sha1(department.encode()).hexdigest()[:12]
+
+
+def get_export_keyboard(departments, compress: bool = False):
+    suffix = ":gz" if compress else ""
+    builder = InlineKeyboardBuilder()
+    builder.row(
+        InlineKeyboardButton(
+            text="👥 Все участники", callback_data=f"admin_export:all{suffix}"
+        ),
+        InlineKeyboardButton(
+            text="✅ Только активные", callback_data=f"admin_export:active{suffix}"
+        ),
     )
-    for row in rows:
-        csv_content += ";".join(str(x) if x is not None else "" for x in row) + "\n"
+    for department, count in departments[:EXPORT_MAX_DEPARTMENTS]:
+        builder.row(
+            InlineKeyboardButton(
+                text=f"🏢 {department} ({count})",
+                callback_data=f"admin_export:dept:{department_key(department)}{suffix}",
+            )
+        )
+    builder.row(
+        InlineKeyboardButton(
+            text="☕ История пар", callback_data=f"admin_export:pairs{suffix}"
+        )
+    )
+    builder.row(
+        InlineKeyboardButton(
+            text=f"🗜 Сжатие gzip: {'вкл' if compress else 'выкл'}",
+            callback_data="admin_export_csv" if compress else "admin_export_csv:gz",
+        )
+    )
+    builder.row(
+        InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")
+    )
+    return builder.as_markup()
 
-    # В реальном боте здесь нужно сохранить файл и отправить его
-    # Для примера покажем первые 5 строк
-    preview = "\n".join(csv_content.split("\n")[:6])
 
-    await call.message.answer(
-        f"{hbold('📁 Экспорт данных (первые 5 строк):')}\n"
-        f"{hcode(preview)}\n\n"
-        "В реальной версии бота здесь будет прикрепленный CSV-файл."
+@admin_router.callback_query(
+    (F.data == "admin_export_csv") | (F.data == "admin_export_csv:gz")
+)
+async def on_admin_export_csv(call: CallbackQuery):
+    departments = await db.get_departments()
+    await call.message.edit_text(
+        f"{hbold('📁 Экспорт данных')}\n\n"
+        "Выберите, что выгрузить. Файл придёт документом CSV (разделитель «;»).",
+        reply_markup=get_export_keyboard(departments, call.data.endswith(":gz")),
     )
     await call.answer()
 
 
+@admin_router.callback_query(F.data.startswith("admin_export:"))
+async def on_admin_export(call: CallbackQuery):
+    parts = call.data.split(":")[1:]
+    compress = parts[-1] == "gz"
+    if compress:
+        parts = parts[:-1]
+    kind = parts[0]
+
+    await call.answer("⏳ Подготавливаем данные...")
+
+    today = datetime.date.today().isoformat()
+    if kind == "pairs":
+        chunks = db.stream_pairs_export()
+        header, name = export.PAIRS_HEADER, f"pairs_{today}"
+    elif kind == "dept":
+        key = parts[1]
+        department = next(
+            (
+                department
+                for department, _ in await db.get_departments()
+                if department_key(department) == key
+            ),
+            None,
+        )
+        if department is None:
+            await call.message.answer("⚠️ Отдел не найден, откройте экспорт заново.")
+            return
+        chunks = db.stream_participants_export(department=department)
+        header, name = export.PARTICIPANTS_HEADER, f"participants_dept_{key}_{today}"
+    else:
+        chunks = db.stream_participants_export(active_only=kind == "active")
+        header, name = export.PARTICIPANTS_HEADER, f"participants_{kind}_{today}"
+
+    document, count = await export.export_document(chunks, header, name, compress)
+    try:
+        if not count:
+            await call.message.answer("ℹ️ Нет данных для экспорта")
+            return
+        await call.message.answer_document(
+            document, caption=f"📁 Выгружено строк: {count}"
+        )
+    finally:
+        document.close()
+
+
 @admin_router.callback_query(F.data == "admin_back_to_menu")
-async def on_admin_back_to_menu(call: CallbackQuery):
+async def on_admin_back_to_menu(call: CallbackQuery, state: FSMContext):
+    # «Отменить» в рассылке и поиске тоже ведёт сюда
+    await clear_admin_state(state)
     await call.message.edit_text(
         f"{hbold('🔧 Панель администратора')}\n\nВыберите действие:",
         reply_markup=get_admin_keyboard(),
@@ -488,143 +976,226 @@ async def on_admin_back_to_menu(call: CallbackQuery):
     await call.answer()
 
 
-@admin_router.callback_query(F.data == "cancel_action")
-async def on_cancel_action(call: CallbackQuery):
-    if call.from_user.id in awaiting_actions:
-        del awaiting_actions[call.from_user.id]
+# Без фильтра по состоянию перехватывал бы «Отменить» регистрации у админов
+@admin_router.callback_query(F.data == "cancel_action", StateFilter(AdminStates))
+async def on_cancel_action(call: CallbackQuery, state: FSMContext):
+    await state.clear()
     await call.message.edit_text(
         "❌ Действие отменено.", reply_markup=get_admin_keyboard()
     )
     await call.answer()
 
 
+@admin_router.message(Command("cancel"), StateFilter(AdminStates))
+async def cmd_cancel(message: Message, state: FSMContext):
+    action = (await state.get_state()).split(":", 1)[1]
+    await state.clear()
+    await message.answer(
+        f"❌ {hbold('Отменено:')} {action.replace('_', ' ')}",
+        reply_markup=get_admin_keyboard(),
+    )
+
+
 @admin_router.message(Command("cancel"))
-async def cmd_cancel(message: Message):
-    if message.from_user.id not in ADMIN_IDS:
+async def cmd_cancel_nothing(message: Message):
+    await message.answer("Нет активных действий для отмены.")
+
+
+@admin_router.message(AdminStates.delete_search, NOT_COMMAND)
+async def on_delete_search_query(message: Message, state: FSMContext):
+    if not message.text:
+        await message.answer("✍️ Отправьте текстом часть имени, username или отдела.")
         return
+    await state.update_data(delete_query=message.text)
+    text, keyboard = await render_delete_search(message.text)
+    await message.answer(text, reply_markup=keyboard)
+
 
-    if message.from_user.id in awaiting_actions:
-        action = awaiting_actions.pop(message.from_user.id)
+@admin_router.message(AdminStates.test_broadcast, NOT_COMMAND)
+async def on_test_broadcast_message(message: Message, state: FSMContext):
+    # Тестовая рассылка - отправляем только админу
+    try:
+        await message.copy_to(message.from_user.id)
         await message.answer(
-            f"❌ {hbold('Отменено:')} {action.replace('_', ' ')}",
+            "✅ Тестовое сообщение отправлено вам. "
+            "Если всё в порядке, можете сделать основную рассылку.",
             reply_markup=get_admin_keyboard(),
         )
-    else:
-        await message.answer("Нет активных действий для отмены.")
+    except Exception as e:
+        logging.error(f"Failed to send test broadcast: {e}")
+        await message.answer(
+            "❌ Не удалось отправить тестовое сообщение.",
+            reply_markup=get_admin_keyboard(),
+        )
+    finally:
+        await state.clear()
 
 
-@admin_router.message()
-async def on_admin_message(message: Message, bot: Bot):
-    if message.from_user.id not in ADMIN_IDS:
+@admin_router.message(AdminStates.broadcast, NOT_COMMAND)
+async def on_broadcast_message(message: Message, state: FSMContext, bot: Bot):
+    # Основная рассылка: фоновая задача с сохранением прогресса в БД
+    await state.clear()
+    try:
+        broadcast_id = await broadcast.start_broadcast(bot, message)
+    except Exception as e:
+        logging.error(f"Failed to start broadcast: {e}")
+        await message.answer(
+            "❌ Не удалось запустить рассылку.", reply_markup=get_admin_keyboard()
+        )
         return
 
-    action = awaiting_actions.get(message.from_user.id)
+    await message.answer(
+        f"⏳ Рассылка #{broadcast_id} запущена в фоне. "
+        "Прогресс обновляется в сообщении выше.",
+        reply_markup=get_admin_keyboard(),
+    )
+
+
+# --- Новый обработчик: Удаление пользователя ---
 
-    if not action:
-        return
 
-    if action == "test_broadcast":
-        # Тестовая рассылка - отправляем только админу
-        try:
-            await message.copy_to(message.from_user.id)
-            await message.answer(
-                "✅ Тестовое сообщение отправлено вам. "
-                "Если всё в порядке, можете сделать основную рассылку.",
-                reply_markup=get_admin_keyboard(),
+async def render_delete_search(query: str, after=None, before=None):
+    """Одна страница результатов поиска: текст и клавиатура с кнопками участников."""
+    rows, has_prev, has_next = await db.search_participants(
+        query, SEARCH_PAGE_SIZE, after=after, before=before
+    )
+    if not rows and (after or before):
+        # Участник-якорь удалён — начнём с первой страницы
+        rows, has_prev, has_next = await db.search_participants(query, SEARCH_PAGE_SIZE)
+    builder = InlineKeyboardBuilder()
+    for user_id, username, full_name, department, is_active in rows:
+        label = f"{full_name} (@{username})" if username else full_name
+        if not is_active:
+            label = f"⏸ {label}"
+        builder.row(
+            InlineKeyboardButton(
+                text=f"{label} · {department}",
+                callback_data=f"admin_delete_pick:{user_id}",
+            )
+        )
+    navigation = []
+    if has_prev:
+        navigation.append(
+            InlineKeyboardButton(
+                text="◀️ Назад", callback_data=f"admin_delete_page:prev:{rows[0][0]}"
             )
-        except Exception as e:
-            logging.error(f"Failed to send test broadcast: {e}")
-            await message.answer(
-                "❌ Не удалось отправить тестовое сообщение.",
-                reply_markup=get_admin_keyboard(),
+        )
+    if has_next:
+        navigation.append(
+            InlineKeyboardButton(
+                text="Вперёд ▶️", callback_data=f"admin_delete_page:next:{rows[-1][0]}"
             )
-        finally:
-            awaiting_actions.pop(message.from_user.id, None)
-
-    elif action == "broadcast":
-        # Основная рассылка
-        users = db.get_all_users()
-        total = len(users)
-        success = 0
-        failed = []
-
-        await message.answer(f"⏳ Начинаем рассылку для {total} пользователей...")
-
-        for user in users:
-            user_id = user[0]  # Берем только ID пользователя
-            try:
-                await message.copy_to(user_id)
-                success += 1
-            except Exception as e:
-                logging.error(f"Failed to send broadcast to {user_id}: {e}")
-                failed.append(user_id)
-                continue
+        )
+    if navigation:
+        builder.row(*navigation)
+    builder.row(
+        InlineKeyboardButton(text="❌ Отменить", callback_data="admin_back_to_menu")
+    )
 
+    if rows:
         text = (
-            f"{hbold('📢 Результаты рассылки:')}\n\n"
-            f"• Всего получателей: {total}\n"
-            f"• Успешно отправлено: {success}\n"
-            f"• Не удалось отправить: {len(failed)}\n"
+            f"{hbold('🗑 Удаление пользователя')}\n\n"
+            f"Результаты по запросу «{html.escape(query)}». Нажмите на участника, "
+            "чтобы удалить, или отправьте новый запрос."
         )
+    else:
+        text = (
+            f"🔍 По запросу «{html.escape(query)}» никого не нашлось.\n"
+            "Попробуйте другую часть имени, username или отдела."
+        )
+    return text, builder.as_markup()
 
-        if failed:
-            text += f"\n{hitalic('Не удалось отправить:')} первые 10 ID: {', '.join(map(str, failed[:10]))}"
 
-        await message.answer(text, reply_markup=get_admin_keyboard())
-        awaiting_actions.pop(message.from_user.id, None)
+@admin_router.callback_query(F.data == "admin_delete_user")
+async def on_admin_delete_user(call: CallbackQuery, state: FSMContext):
+    if not await enter_admin_state(call, state, AdminStates.delete_search):
+        return
 
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="❌ Отменить", callback_data="admin_back_to_menu"
+                )
+            ]
+        ]
+    )
 
-# --- Новый обработчик: Удаление пользователя ---
+    await call.message.edit_text(
+        f"{hbold('🗑 Удаление пользователя')}\n\n"
+        "Отправьте часть имени, username или названия отдела — "
+        "покажу подходящих участников.\n\n"
+        f"{hitalic('Для отмены нажмите кнопку ниже или отправьте /cancel')}",
+        reply_markup=keyboard,
+    )
+    await call.answer()
 
 
-@admin_router.callback_query(F.data.startswith("admin_delete_user"))
-async def on_admin_delete_user(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
+@admin_router.callback_query(F.data.startswith("admin_delete_page:"))
+async def on_admin_delete_page(call: CallbackQuery, state: FSMContext):
+    query = (await state.get_data()).get("delete_query")
+    if not query:
+        await call.answer("Поиск устарел, отправьте запрос заново", show_alert=True)
         return
 
-    users = db.get_all_users()
-    if not users:
-        await call.message.answer("ℹ️ Нет зарегистрированных пользователей.")
-        return
+    _, direction, user_id = call.data.split(":")
+    if direction == "next":
+        text, keyboard = await render_delete_search(query, after=int(user_id))
+    else:
+        text, keyboard = await render_delete_search(query, before=int(user_id))
+    await call.message.edit_text(text, reply_markup=keyboard)
+    await call.answer()
 
-    # Сообщение-инструкция
-    await call.message.edit_text(
-        f"{hbold('🗑 Удаление пользователя')}\n\n"
-        "Ниже показаны ВСЕ пользователи. Нажмите на имя, чтобы удалить.\n"
-        "(Список разбит на несколько сообщений, если пользователей много.)"
-    )
 
-    # Телеграм ограничивает размер клавиатуры, поэтому отправляем несколько сообщений по 45 кнопок
-    for idx, chunk in enumerate(chunk_list(users, 45)):
-        keyboard_rows = [
+@admin_router.callback_query(F.data.startswith("admin_delete_pick:"))
+async def on_admin_delete_pick(call: CallbackQuery):
+    user_id = int(call.data.split(":")[1])
+    user = await db.get_user(user_id)
+    if not user:
+        await call.answer("Пользователь уже удалён", show_alert=True)
+        return
+
+    _, username, _, _, full_name, position, department, _, last_participation, _ = user
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text=(f"{u[2]} (@{u[1]})" if u[1] else u[2]),
-                    callback_data=f"admin_delete_confirm:{u[0]}",
-                )
+                    text="✅ Да, удалить",
+                    callback_data=f"admin_delete_confirm:{user_id}",
+                ),
+                InlineKeyboardButton(
+                    text="🔙 К результатам",
+                    callback_data="admin_delete_results",
+                ),
             ]
-            for u in chunk
         ]
-        keyboard_rows.append(
-            [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_back_to_menu")]
-        )
-        keyboard = InlineKeyboardMarkup(inline_keyboard=keyboard_rows)
-        await call.message.answer(
-            f"Список для удаления — часть {idx+1}", reply_markup=keyboard
-        )
-
+    )
+    await call.message.edit_text(
+        f"{hbold('Удалить участника?')}\n\n"
+        f"👤 {full_name}" + (f" (@{username})" if username else "") + "\n"
+        f"💼 {position}, {department}\n"
+        f"📅 Последнее участие: {last_participation or 'ещё не было'}",
+        reply_markup=keyboard,
+    )
     await call.answer()
 
 
-@admin_router.callback_query(F.data.startswith("admin_delete_confirm:"))
-async def on_admin_delete_confirm(call: CallbackQuery):
-    if call.from_user.id not in ADMIN_IDS:
-        await call.answer("⛔ Нет доступа", show_alert=True)
+@admin_router.callback_query(F.data == "admin_delete_results")
+async def on_admin_delete_results(call: CallbackQuery, state: FSMContext):
+    query = (await state.get_data()).get("delete_query")
+    if not query:
+        await call.answer("Поиск устарел, отправьте запрос заново", show_alert=True)
         return
+    text, keyboard = await render_delete_search(query)
+    await call.message.edit_text(text, reply_markup=keyboard)
+    await call.answer()
 
+
+@admin_router.callback_query(F.data.startswith("admin_delete_confirm:"))
+async def on_admin_delete_confirm(call: CallbackQuery, state: FSMContext):
     user_id = int(call.data.split(":")[1])
-    db.delete_user(user_id)
+    await db.delete_user(user_id)
+    await clear_admin_state(state)
 
     try:
         await call.bot.send_message(
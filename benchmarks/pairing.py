@@ -0,0 +1,336 @@
+"""
+Pairing benchmark: builds synthetic participants/pairs databases of several
+sizes and times eligibility selection, the forecast's eligibility pass,
+matching, message and reminder rendering, persistence, the admin's
+plan/preview phase, a full pair_users run and admin list pages against a fake Bot.
+
+Usage:
+    python benchmarks/pairing.py --sizes 1000 10000 100000 --latency 0.01 --output bench.json
+
+Results are printed (or written to --output) as JSON so runs of different
+versions can be compared.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# config.py requires a token; the benchmark never talks to Telegram
+os.environ.setdefault("BOT_TOKEN", "0:benchmark")
+# Scratch database in a temporary directory removed on exit (unless DB_PATH is given)
+workdir = None
+if "DB_PATH" not in os.environ:
+    workdir = tempfile.TemporaryDirectory(prefix="coffee-bench-")
+    os.environ["DB_PATH"] = os.path.join(workdir.name, "bench.db")
+
+import db  # noqa: E402
+import sender  # noqa: E402
+import templates  # noqa: E402
+from admin_handlers import (  # noqa: E402
+    on_admin_list,
+    pair_users,
+    plan_round,
+)
+from config import ADMIN_IDS, MATCH_HISTORY_WEEKS  # noqa: E402
+from matching import build_history, match_users  # noqa: E402
+
+DEPARTMENTS = ["Разработка", "Маркетинг", "Финансы", "HR", "Продажи", "Поддержка"]
+
+
+class FakeBot:
+    """Records outgoing calls; each call takes `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    async def _call(self, chat_id, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        return SimpleNamespace(message_id=self.calls, chat=SimpleNamespace(id=chat_id))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._call(chat_id, text=text, **kwargs)
+
+    async def copy_message(self, chat_id, from_chat_id, message_id, **kwargs):
+        return await self._call(chat_id, **kwargs)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        return await self._call(chat_id, text=text, **kwargs)
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat_id: int):
+        self.bot = bot
+        self.chat = SimpleNamespace(id=chat_id)
+
+    async def answer(self, text, **kwargs):
+        return await self.bot.send_message(self.chat.id, text, **kwargs)
+
+    async def edit_text(self, text, **kwargs):
+        return await self.bot.edit_message_text(text, chat_id=self.chat.id, **kwargs)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot: FakeBot, user_id: int, data: str):
+        self.bot = bot
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = FakeMessage(bot, user_id)
+
+    async def answer(self, *args, **kwargs):
+        return True
+
+
+# Every 100th synthetic user belongs to a small second cohort (another office)
+SMALL_COHORT_ID = 2
+
+
+def populate(size: int, history_rounds: int, seed: int):
+    """Replace database contents with `size` synthetic users and past rounds."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    conn = db.conn
+    with conn:
+        for table in ("reminders", "pairs", "rounds", "participants"):
+            conn.execute(f"DELETE FROM {table}")
+
+        rows = []
+        for uid in range(1, size + 1):
+            frequency = rng.choice((1, 1, 1, 2, 4))
+            last = None
+            if rng.random() < 0.8:
+                last = (today - datetime.timedelta(days=rng.randint(1, 60))).isoformat()
+            next_eligible = (
+                (datetime.date.fromisoformat(last) + datetime.timedelta(weeks=frequency))
+                if last
+                else today
+            ).isoformat()
+            rows.append(
+                (
+                    uid,
+                    f"user{uid}" if rng.random() < 0.9 else None,
+                    f"Имя{uid}",
+                    f"Фамилия{uid}",
+                    f"Имя{uid} Фамилия{uid}",
+                    "Инженер",
+                    rng.choice(DEPARTMENTS),
+                    frequency,
+                    last,
+                    next_eligible,
+                    rng.random() < 0.9,
+                    SMALL_COHORT_ID if uid % 100 == 0 else db.DEFAULT_COHORT_ID,
+                )
+            )
+        conn.executemany(
+            "INSERT INTO participants (user_id, username, first_name, last_name, "
+            "full_name, position, department, frequency, last_participation, "
+            "next_eligible_date, is_active, cohort_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+        ids = list(range(1, size + 1))
+        for week in range(history_rounds, 0, -1):
+            week_date = (today - datetime.timedelta(weeks=week)).isoformat()
+            round_id = conn.execute(
+                "INSERT INTO rounds (week_date) VALUES (?)", (week_date,)
+            ).lastrowid
+            rng.shuffle(ids)
+            pair_rows = []
+            for a, b in zip(ids[::2], ids[1::2]):
+                pair_rows.append((round_id, a, b, week_date))
+                pair_rows.append((round_id, b, a, week_date))
+            conn.executemany(
+                "INSERT INTO pairs (round_id, user_id, partner_id, week_date) "
+                "VALUES (?, ?, ?, ?)",
+                pair_rows,
+            )
+    conn.execute("ANALYZE")
+
+
+async def timed(results: dict, name: str, coro):
+    started = time.perf_counter()
+    value = await coro
+    results[name] = round(time.perf_counter() - started, 6)
+    return value
+
+
+def timed_sync(results: dict, name: str, func, *args, **kwargs):
+    started = time.perf_counter()
+    value = func(*args, **kwargs)
+    results[name] = round(time.perf_counter() - started, 6)
+    return value
+
+
+async def run_size(size: int, args) -> dict:
+    results = {"size": size}
+    timed_sync(results, "populate", populate, size, args.history_rounds, args.seed)
+
+    eligible = await timed(results, "get_eligible_users", db.get_eligible_users())
+    # Should stay flat as the table grows: the index starts with cohort_id
+    small = await timed(
+        results,
+        "get_eligible_users_small_cohort",
+        db.get_eligible_users(SMALL_COHORT_ID),
+    )
+    results["small_cohort_eligible_count"] = len(small)
+    # Forecast input: one grouped pass over all active participants
+    await timed(results, "get_cohort_eligibility", db.get_cohort_eligibility())
+    active = await timed(results, "get_all_active_users", db.get_all_active_users())
+    results["eligible_count"] = len(eligible)
+    results["active_count"] = len(active)
+
+    history_rows = await timed(
+        results, "get_pair_history", db.get_pair_history(MATCH_HISTORY_WEEKS)
+    )
+    history = timed_sync(results, "build_history", build_history, history_rows)
+    matching = timed_sync(
+        results, "match_users", match_users, eligible, history, seed=args.seed
+    )
+    results["repeat_pairs"] = matching.repeats
+
+    results["triads"] = sum(1 for group in matching.groups if len(group) == 3)
+
+    def render():
+        for group in matching.groups:
+            for member in group:
+                others = [other for other in group if other is not member]
+                if len(others) == 1:
+                    templates.partner_message(others[0])
+                else:
+                    templates.group_message(others)
+
+    timed_sync(results, "render_messages", render)
+    messages = sum(len(group) for group in matching.groups)
+    results["render_per_message_us"] = round(
+        results["render_messages"] / max(messages, 1) * 1e6, 3
+    )
+
+    # Weekly reminder: shared text, keyboard built per recipient
+    partners = [
+        {"full_name": member[2], "username": member[1]}
+        for member in eligible
+    ]
+
+    def render_reminders():
+        for partner in partners:
+            templates.render("weekly_reminder")
+            templates.partner_keyboard([partner])
+
+    timed_sync(results, "render_reminders", render_reminders)
+    results["render_reminder_per_message_us"] = round(
+        results["render_reminders"] / max(len(partners), 1) * 1e6, 3
+    )
+
+    group_ids = [tuple(member[0] for member in group) for group in matching.groups]
+    await timed(results, "commit_round", db.commit_round(group_ids))
+
+    # Admin preview: planning must stay cheap enough to re-run several times
+    populate(size, args.history_rounds, args.seed)
+    planned = await timed(
+        results, "plan_round", plan_round(force_all=True, seed=args.seed)
+    )
+    await timed(
+        results,
+        "save_plan",
+        db.save_plan(
+            [tuple(member[0] for member in group) for group in planned.groups],
+            [member[0] for member in planned.leftover],
+            repeats=planned.repeats,
+            forced=True,
+        ),
+    )
+
+    # Full round against the fake bot (rate limits lifted to measure our own overhead)
+    populate(size, args.history_rounds, args.seed)
+    bot = FakeBot(args.latency)
+    sender.sender = sender.Sender(rate=args.send_rate, per_chat_rate=args.send_rate)
+    await timed(results, "pair_users", pair_users(bot, seed=args.seed))
+    results["pair_users_sends"] = bot.calls
+
+    bot = FakeBot(args.latency)
+    admin_id = min(ADMIN_IDS)
+    await timed(
+        results,
+        "admin_list",
+        on_admin_list(FakeCallbackQuery(bot, admin_id, "admin_list")),
+    )
+    results["admin_list_calls"] = bot.calls
+    await timed(
+        results,
+        "admin_list_next_page",
+        on_admin_list(
+            FakeCallbackQuery(bot, admin_id, f"admin_list:next:{size // 2}")
+        ),
+    )
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True
+        ).strip()
+    except Exception:
+        return ""
+
+
+async def main(args):
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "latency": args.latency,
+            "send_rate": args.send_rate,
+            "history_rounds": args.history_rounds,
+            "seed": args.seed,
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} users…", file=sys.stderr)
+        report["results"].append(await run_size(size, args))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="fake Bot API latency, seconds"
+    )
+    parser.add_argument(
+        "--send-rate", type=float, default=1e9, help="sender rate limit, msg/s"
+    )
+    parser.add_argument("--history-rounds", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        db.close_connection()
+        if workdir is not None:
+            workdir.cleanup()
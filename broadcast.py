@@ -0,0 +1,150 @@
+"""
+Broadcast module: persisted background broadcast jobs.
+A job copies one admin message to every active user in batches through the
+shared sender, saving its cursor after each batch so it can resume after a
+restart (at most one batch may be delivered twice).
+"""
+
+import asyncio
+import logging
+import time
+from typing import List, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from aiogram.utils.markdown import hbold, hitalic
+
+import db
+import sender
+from config import BROADCAST_BATCH_SIZE, BROADCAST_PROGRESS_INTERVAL
+
+# Keep references to running jobs so they are not garbage collected
+_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(bot: Bot, broadcast_id: int):
+    task = asyncio.create_task(run_broadcast(bot, broadcast_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} сек"
+    return f"{seconds // 60} мин {seconds % 60:02d} сек"
+
+
+def render_progress(job: dict, eta: float = None, failed: List[int] = ()) -> str:
+    processed = job["sent"] + job["failed"]
+    remaining = max(job["total"] - processed, 0)
+    title = f"📢 Рассылка #{job['id']}"
+    text = (
+        f"{hbold(title)}\n\n"
+        f"• Всего получателей: {job['total']}\n"
+        f"• Успешно отправлено: {job['sent']}\n"
+        f"• Не удалось отправить: {job['failed']}\n"
+        f"• Осталось: {remaining}\n"
+    )
+    if job["status"] == "running":
+        if eta is not None:
+            text += f"• Осталось времени: ~{_format_eta(eta)}\n"
+    else:
+        text += f"\n{hbold('✅ Рассылка завершена')}\n"
+        if failed:
+            text += f"\n{hitalic('Не удалось отправить:')} первые 10 ID: {', '.join(map(str, failed))}"
+    return text
+
+
+async def _show_progress(bot: Bot, job: dict, eta: float = None):
+    if not job["progress_message_id"]:
+        return
+    failed = []
+    if job["status"] != "running":
+        failed = await db.get_broadcast_failures(job["id"])
+    try:
+        await bot.edit_message_text(
+            render_progress(job, eta, failed),
+            chat_id=job["admin_id"],
+            message_id=job["progress_message_id"],
+        )
+    except TelegramBadRequest as e:
+        # "message is not modified" and similar are harmless here
+        logging.debug(f"Broadcast #{job['id']} progress edit skipped: {e}")
+    except Exception as e:
+        logging.error(f"Broadcast #{job['id']} progress edit failed: {e}")
+
+
+async def start_broadcast(bot: Bot, message: Message) -> int:
+    """Persist a new broadcast of `message` and start it in the background."""
+    broadcast_id = await db.create_broadcast(
+        message.from_user.id, message.chat.id, message.message_id
+    )
+    job = await db.get_broadcast(broadcast_id)
+    progress = await bot.send_message(job["admin_id"], render_progress(job))
+    await db.set_broadcast_progress_message(broadcast_id, progress.message_id)
+    _spawn(bot, broadcast_id)
+    return broadcast_id
+
+
+async def resume_broadcasts(bot: Bot):
+    """Restart jobs left unfinished by a previous process."""
+    for broadcast_id in await db.get_running_broadcasts():
+        logging.info(f"Resuming broadcast #{broadcast_id}")
+        _spawn(bot, broadcast_id)
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int):
+    job = await db.get_broadcast(broadcast_id)
+    if not job:
+        return
+
+    started = time.monotonic()
+    last_edit = started
+    processed = 0
+
+    try:
+        while True:
+            recipients = await db.get_broadcast_recipients(
+                broadcast_id, BROADCAST_BATCH_SIZE
+            )
+            if not recipients:
+                break
+
+            results = await sender.sender.deliver(
+                sender.copy(bot, uid, job["from_chat_id"], job["message_id"])
+                for uid in recipients
+            )
+            failures = [
+                (uid, str(res.error)) for uid, res in results.items() if not res.ok
+            ]
+            await db.advance_broadcast(
+                broadcast_id,
+                recipients[-1],
+                len(recipients) - len(failures),
+                failures,
+            )
+            processed += len(recipients)
+
+            now = time.monotonic()
+            if now - last_edit >= BROADCAST_PROGRESS_INTERVAL:
+                job = await db.get_broadcast(broadcast_id)
+                remaining = max(job["total"] - job["sent"] - job["failed"], 0)
+                eta = remaining * (now - started) / processed
+                await _show_progress(bot, job, eta)
+                last_edit = now
+    except asyncio.CancelledError:
+        logging.info(f"Broadcast #{broadcast_id} interrupted, will resume on restart")
+        raise
+    except Exception as e:
+        logging.exception(f"Broadcast #{broadcast_id} failed: {e}")
+        await db.finish_broadcast(broadcast_id, "failed")
+        return
+
+    await db.finish_broadcast(broadcast_id)
+    job = await db.get_broadcast(broadcast_id)
+    logging.info(
+        f"Broadcast #{broadcast_id} finished: sent={job['sent']}, failed={job['failed']}"
+    )
+    await _show_progress(bot, job)
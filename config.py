@@ -3,6 +3,8 @@ Config module: loads environment variables and defines configuration constants.
 """
 
 import os
+from zoneinfo import ZoneInfo
+
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,24 +15,85 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN is not set in environment")
 
-# List of admin user IDs (as integers) from environment
-ADMIN_IDS = []
+# Admin user IDs (as integers) from environment; frozenset for O(1) membership checks
+ADMIN_IDS = frozenset()
 admin_ids_str = os.getenv("ADMIN_IDS")
 if admin_ids_str:
     try:
-        ADMIN_IDS = [int(x) for x in admin_ids_str.split(",")]
+        ADMIN_IDS = frozenset(int(x) for x in admin_ids_str.split(","))
     except ValueError:
         raise RuntimeError("ADMIN_IDS environment variable is malformed")
 
 # Default to provided IDs (from specification) if none set in .env
 if not ADMIN_IDS:
-    ADMIN_IDS = [764643451, 8128706897]
+    ADMIN_IDS = frozenset((764643451, 8128706897))
 
 # Database file path (default 'coffee_bot.db' in current directory)
 DB_PATH = os.getenv("DB_PATH", "coffee_bot.db")
 
 # Schedule configuration for weekly pairing (default: every Monday at 10:00)
-# Day of week can be "mon", "tue", ..., "sun" (or numeric 0=Monday)
+# Day of week can be "mon", "tue", ..., "sun" (or numeric 0=Monday).
+# Used by the default cohort and by cohorts created without their own schedule
 SCHEDULE_DAY = os.getenv("SCHEDULE_DAY", "mon")
 SCHEDULE_HOUR = int(os.getenv("SCHEDULE_HOUR", "10"))
 SCHEDULE_MINUTE = int(os.getenv("SCHEDULE_MINUTE", "00"))
+# Time zone of all scheduled jobs (pairing rounds, reminders) and of the forecast
+SCHEDULE_TIMEZONE = ZoneInfo(os.getenv("SCHEDULE_TIMEZONE", "Europe/Moscow"))
+
+# Outbound delivery limits (Telegram allows ~30 msg/s globally and ~1 msg/s per chat)
+SEND_RATE = float(os.getenv("SEND_RATE", "30"))
+SEND_PER_CHAT_RATE = float(os.getenv("SEND_PER_CHAT_RATE", "1"))
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", "16"))
+SEND_MAX_ATTEMPTS = int(os.getenv("SEND_MAX_ATTEMPTS", "3"))
+
+# Broadcast jobs: recipients per batch (cursor is saved after each batch)
+# and minimal interval between progress message edits, in seconds
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "100"))
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "3"))
+
+# Matching: how many weeks of pair history to avoid repeating, whether to avoid
+# pairing colleagues from the same department, and an optional fixed seed
+MATCH_HISTORY_WEEKS = int(os.getenv("MATCH_HISTORY_WEEKS", "26"))
+MATCH_AVOID_SAME_DEPARTMENT = os.getenv("MATCH_AVOID_SAME_DEPARTMENT", "0") == "1"
+MATCH_SEED = int(os.getenv("MATCH_SEED")) if os.getenv("MATCH_SEED") else None
+# With an odd count the last participant joins a pair as a group of three
+# ("0" leaves them out until the next round instead)
+MATCH_TRIADS = os.getenv("MATCH_TRIADS", "1") == "1"
+
+# Post-pairing reminders: delay after the round and how often the due-queue is swept
+REMINDER_DELAY_DAYS = int(os.getenv("REMINDER_DELAY_DAYS", "3"))
+REMINDER_SWEEP_SECONDS = int(os.getenv("REMINDER_SWEEP_SECONDS", "60"))
+
+# Update delivery: "polling" (default) or "webhook". In webhook mode the bot
+# serves updates on WEBHOOK_HOST:WEBHOOK_PORT at WEBHOOK_PATH; if WEBHOOK_URL
+# (public base URL) is set the webhook is registered with Telegram on startup
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100"))
+# Every webhook request must carry the secret token, so webhook mode needs one
+if BOT_MODE == "webhook" and not WEBHOOK_SECRET:
+    raise RuntimeError("WEBHOOK_SECRET must be set when BOT_MODE=webhook")
+
+# FSM storage: in-memory LRU size, write-behind flush interval (seconds) and
+# how long an idle registration state is kept (seconds)
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "2"))
+FSM_TTL_SECONDS = int(os.getenv("FSM_TTL_SECONDS", "86400"))
+
+# Admin statistics are cached for this many seconds (writes invalidate earlier)
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "60"))
+
+# Profile cache in front of db.get_user: max entries and lifetime in seconds
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+# Metrics endpoint (GET /metrics, Prometheus text format); port 0 disables it
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# Language of user-facing messages (see templates.py): "ru" or "en"
+LOCALE = os.getenv("LOCALE", "ru")
@@ -1,18 +1,51 @@
 """
 Database module: handles SQLite database connections and operations.
 Enhanced for better integration with the updated bot functionality.
+
+Query functions are coroutines: each one runs on a dedicated DB thread that
+owns the connection, so slow queries never block the event loop.
 """
 
+import asyncio
+import functools
 import sqlite3
 import datetime
-from typing import List, Tuple, Optional
-from config import DB_PATH
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+import metrics
+from cache import TTLCache
+from config import DB_PATH, PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL, STATS_CACHE_TTL
 
 # Connect to the SQLite database with WAL mode for better concurrency
 conn = sqlite3.connect(DB_PATH, check_same_thread=False)
 conn.execute("PRAGMA foreign_keys = ON;")
 conn.execute("PRAGMA journal_mode = WAL;")  # Better for concurrent access
 
+# Default cohort: every participant and round belong to it unless told otherwise
+DEFAULT_COHORT_ID = 1
+
+# Cohorts: isolated rosters (offices, chats) paired separately on their own
+# schedule. NULL schedule fields fall back to SCHEDULE_* from config;
+# frequency = a scheduled round every N weeks
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS cohorts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        schedule_day TEXT,
+        schedule_hour INTEGER,
+        schedule_minute INTEGER,
+        frequency INTEGER NOT NULL DEFAULT 1 CHECK(frequency >= 1),
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+)
+conn.execute(
+    "INSERT OR IGNORE INTO cohorts (id, name) VALUES (?, 'default')",
+    (DEFAULT_COHORT_ID,),
+)
+
 # Table schema with additional useful fields
 conn.execute(
     """
@@ -26,20 +59,139 @@ conn.execute(
         department TEXT NOT NULL,
         frequency INTEGER DEFAULT 1 CHECK(frequency >= 1),
         last_participation TEXT,
+        next_eligible_date TEXT,
         registration_date TEXT DEFAULT CURRENT_DATE,
-        is_active BOOLEAN DEFAULT TRUE
+        is_active BOOLEAN DEFAULT TRUE,
+        left_out_date TEXT,
+        cohort_id INTEGER NOT NULL DEFAULT 1
+    )
+    """
+)
+
+# Pairing rounds: one row per pair_users run
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS rounds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        week_date TEXT NOT NULL,
+        forced BOOLEAN DEFAULT FALSE,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        cohort_id INTEGER NOT NULL DEFAULT 1
+    )
+    """
+)
+
+# Planned rounds: computed and previewed by an admin, then committed or cancelled
+# ('failed' if the dispatch broke off).
+# base_round_id is the latest round when planned; a plan is stale once a newer round exists
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS planned_rounds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER,
+        forced BOOLEAN DEFAULT FALSE,
+        status TEXT NOT NULL DEFAULT 'planned',
+        base_round_id INTEGER NOT NULL DEFAULT 0,
+        repeats INTEGER NOT NULL DEFAULT 0,
+        round_id INTEGER,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        cohort_id INTEGER NOT NULL DEFAULT 1
+    )
+    """
+)
+# Members of a planned round: group_no numbers the groups, NULL = left without a group
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS planned_members (
+        plan_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        group_no INTEGER,
+        PRIMARY KEY (plan_id, user_id)
     )
     """
 )
 
-# Table schema for storing weekly pairs
+# Table schema for storing weekly pairs (both directions of every pair)
 conn.execute(
     """
     CREATE TABLE IF NOT EXISTS pairs (
-        user_id INTEGER,
-        partner_id INTEGER,
-        week_date TEXT,
-        PRIMARY KEY (user_id, week_date)
+        round_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        partner_id INTEGER NOT NULL,
+        week_date TEXT NOT NULL,
+        cohort_id INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (round_id, user_id, partner_id)
+    )
+    """
+)
+
+# Due-queue of post-pairing reminders (due_at is UTC "YYYY-MM-DD HH:MM:SS")
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS reminders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        round_id INTEGER,
+        user_id INTEGER NOT NULL,
+        partner_id INTEGER NOT NULL,
+        due_at TEXT NOT NULL
+    )
+    """
+)
+conn.execute("CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(due_at)")
+
+# Users whose chat rejects messages for good (blocked the bot, deleted account);
+# they are deactivated and skipped until they come back via /start
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS suppressed_chats (
+        user_id INTEGER PRIMARY KEY,
+        reason TEXT,
+        suppressed_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+)
+
+# FSM states and data (JSON) of users in the middle of a dialog
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS fsm_states (
+        key TEXT PRIMARY KEY,
+        state TEXT,
+        data TEXT NOT NULL DEFAULT '{}',
+        updated_at REAL NOT NULL
+    )
+    """
+)
+conn.execute("CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm_states(updated_at)")
+
+# Broadcast jobs: recipients are active users ordered by user_id, `cursor` is the
+# last user_id already processed, so a job can resume after a restart
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admin_id INTEGER NOT NULL,
+        from_chat_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        progress_message_id INTEGER,
+        status TEXT NOT NULL DEFAULT 'running',
+        cursor INTEGER NOT NULL DEFAULT 0,
+        max_user_id INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        sent INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        finished_at TEXT
+    )
+    """
+)
+conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS broadcast_failures (
+        broadcast_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        error TEXT,
+        PRIMARY KEY (broadcast_id, user_id)
     )
     """
 )
@@ -66,18 +218,215 @@ def ensure_schema():
             (today,),
         )
 
+    # Add next_eligible_date (last_participation + frequency weeks, or the day
+    # the user became eligible if never paired) and backfill existing rows
+    if "next_eligible_date" not in existing_columns:
+        conn.execute("ALTER TABLE participants ADD COLUMN next_eligible_date TEXT")
+        today = datetime.date.today().isoformat()
+        conn.execute(
+            "UPDATE participants SET next_eligible_date = COALESCE("
+            "date(last_participation, '+' || (frequency * 7) || ' days'), "
+            "registration_date, ?)",
+            (today,),
+        )
+
+    # Date the user was last left without a group (cleared once placed)
+    if "left_out_date" not in existing_columns:
+        conn.execute("ALTER TABLE participants ADD COLUMN left_out_date TEXT")
+
+    # Old pairs table was keyed by (user_id, week_date) without a round id;
+    # rebuild it, keeping legacy rows under round 0
+    cur = conn.execute("PRAGMA table_info(pairs)")
+    if "round_id" not in {row[1] for row in cur.fetchall()}:
+        conn.execute("ALTER TABLE pairs RENAME TO pairs_legacy")
+        conn.execute(
+            "CREATE TABLE pairs ("
+            "round_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "partner_id INTEGER NOT NULL, week_date TEXT NOT NULL, "
+            "PRIMARY KEY (round_id, user_id, partner_id))"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO pairs (round_id, user_id, partner_id, week_date) "
+            "SELECT 0, user_id, partner_id, week_date FROM pairs_legacy "
+            "WHERE user_id IS NOT NULL AND partner_id IS NOT NULL"
+        )
+        conn.execute("DROP TABLE pairs_legacy")
+
+    # Cohort of participants and of every round/pair (existing rows join the default one)
+    for table in ("participants", "rounds", "pairs", "planned_rounds"):
+        cur = conn.execute(f"PRAGMA table_info({table})")
+        if "cohort_id" not in {row[1] for row in cur.fetchall()}:
+            conn.execute(
+                f"ALTER TABLE {table} ADD COLUMN cohort_id INTEGER NOT NULL DEFAULT 1"
+            )
+
+    # Reminders queued for users who unsubscribed or were deleted before
+    # deactivate_user/delete_user started dropping them
+    conn.execute(
+        "DELETE FROM reminders WHERE user_id NOT IN "
+        "(SELECT user_id FROM participants WHERE is_active = TRUE)"
+    )
+
     conn.commit()
 
 
 ensure_schema()
 
-# Create index for faster queries on active users (after ensuring schema)
+# Eligibility is a range scan within one cohort over (is_active, next_eligible_date),
+# so its cost depends on the cohort's size, not on the whole table
+conn.execute("DROP INDEX IF EXISTS idx_active_users")
+conn.execute("DROP INDEX IF EXISTS idx_eligible")
+conn.execute(
+    "CREATE INDEX IF NOT EXISTS idx_cohort_eligible "
+    "ON participants(cohort_id, is_active, next_eligible_date)"
+)
+# Latest partner of a user
+conn.execute(
+    "CREATE INDEX IF NOT EXISTS idx_pairs_user ON pairs(user_id, week_date, round_id)"
+)
+# Recent history of one cohort for the matcher
+conn.execute("DROP INDEX IF EXISTS idx_pairs_week")
+conn.execute(
+    "CREATE INDEX IF NOT EXISTS idx_pairs_cohort_week ON pairs(cohort_id, week_date)"
+)
+# Latest round of a cohort
+conn.execute("CREATE INDEX IF NOT EXISTS idx_rounds_cohort ON rounds(cohort_id, id)")
+# Few users are ever left out; they are matched first next round
 conn.execute(
-    "CREATE INDEX IF NOT EXISTS idx_active_users ON participants(is_active, frequency, last_participation)"
+    "CREATE INDEX IF NOT EXISTS idx_left_out ON participants(left_out_date) "
+    "WHERE left_out_date IS NOT NULL"
+)
+# Keyset pagination of the admin participant list
+conn.execute(
+    "CREATE INDEX IF NOT EXISTS idx_participants_name ON participants(full_name, user_id)"
 )
 conn.commit()
 
 
+def _ensure_search_index() -> bool:
+    """
+    Full-text index over full_name/username/department kept in sync by triggers.
+    Returns False if this SQLite build has no FTS5 (search falls back to LIKE).
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'participants_fts'"
+    ).fetchone()
+    try:
+        with conn:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS participants_fts USING fts5("
+                "full_name, username, department, "
+                "content='participants', content_rowid='user_id', "
+                "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS participants_fts_ai AFTER INSERT ON participants "
+                "BEGIN INSERT INTO participants_fts (rowid, full_name, username, department) "
+                "VALUES (new.user_id, new.full_name, new.username, new.department); END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS participants_fts_ad AFTER DELETE ON participants "
+                "BEGIN INSERT INTO participants_fts "
+                "(participants_fts, rowid, full_name, username, department) "
+                "VALUES ('delete', old.user_id, old.full_name, old.username, old.department); END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS participants_fts_au AFTER UPDATE OF "
+                "full_name, username, department ON participants "
+                "BEGIN INSERT INTO participants_fts "
+                "(participants_fts, rowid, full_name, username, department) "
+                "VALUES ('delete', old.user_id, old.full_name, old.username, old.department); "
+                "INSERT INTO participants_fts (rowid, full_name, username, department) "
+                "VALUES (new.user_id, new.full_name, new.username, new.department); END"
+            )
+            if not exists:
+                # Index participants registered before the search existed
+                conn.execute("INSERT INTO participants_fts (participants_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        print(f"[DB] FTS5 недоступен, поиск участников через LIKE: {e}")
+        return False
+    return True
+
+
+_fts_enabled = _ensure_search_index()
+
+
+# Single worker thread = serialized access to `conn` through the executor's queue
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+
+
+def _timed(name: str, func, /, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        metrics.DB_QUERY_SECONDS.observe(time.perf_counter() - started, query=name)
+
+
+def _run_as(name: str, func, /, *args, **kwargs) -> asyncio.Future:
+    """Schedule a blocking call on the DB thread, timed under `name`."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(
+        _executor, functools.partial(_timed, name, func, *args, **kwargs)
+    )
+
+
+def _run(func, /, *args, **kwargs) -> asyncio.Future:
+    """Schedule a blocking call on the DB thread and return an awaitable."""
+    return _run_as(func.__name__, func, *args, **kwargs)
+
+
+def _offload(func):
+    """Turn a blocking query function into a coroutine running on the DB thread."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _run(func, *args, **kwargs)
+
+    return wrapper
+
+
+# Aggregated admin statistics and the round forecast; every write to participants
+# (and to cohort schedules) clears it
+stats_cache = TTLCache(STATS_CACHE_TTL)
+# get_user rows by user_id; writes to a participant drop their entry
+profile_cache = TTLCache(PROFILE_CACHE_TTL, maxsize=PROFILE_CACHE_SIZE)
+
+
+for _name, _cache in (("profile", profile_cache), ("stats", stats_cache)):
+    metrics.Gauge(
+        f"bot_{_name}_cache_hits_total", f"{_name} cache hits",
+        functools.partial(getattr, _cache, "hits"), kind="counter",
+    )
+    metrics.Gauge(
+        f"bot_{_name}_cache_misses_total", f"{_name} cache misses",
+        functools.partial(getattr, _cache, "misses"), kind="counter",
+    )
+
+
+def _invalidate(*user_ids: int):
+    """Drop cached data affected by a write to these participants (DB thread)."""
+    for user_id in user_ids:
+        profile_cache.pop(user_id)
+    stats_cache.clear()
+
+
+async def _stream(
+    query: str, params: tuple = (), batch_size: int = 500
+) -> AsyncIterator[List[Tuple]]:
+    """Run a query on the DB thread and yield its rows in chunks of `batch_size`."""
+    cur = await _run_as("stream", conn.execute, query, params)
+    try:
+        while True:
+            rows = await _run_as("stream", cur.fetchmany, batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        await _run_as("stream", cur.close)
+
+
+@_offload
 def ensure_user(
     user_id: int,
     username: str,
@@ -87,23 +436,32 @@ def ensure_user(
     position: str,
     department: str,
     frequency: int = 1,
+    cohort_id: Optional[int] = None,
 ) -> bool:
     """
-    Add or update user in the database.
+    Add or update user in the database. A new user joins `cohort_id` (default
+    cohort if None); an existing one moves there only if it is given.
     Returns True if new user was created, False if existing user was updated.
     """
 
-    # Use parameterized queries and transaction
+    today = datetime.date.today().isoformat()
+
+    # Use parameterized queries and transaction; next_eligible_date follows
+    # the (possibly changed) frequency of an existing user
     with conn:
         conn.execute(
             "INSERT INTO participants (user_id, username, first_name, last_name, full_name, "
-            "position, department, frequency, is_active) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, TRUE) "
+            "position, department, frequency, next_eligible_date, is_active, cohort_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, TRUE, COALESCE(?, ?)) "
             "ON CONFLICT(user_id) DO UPDATE SET "
             "username=excluded.username, first_name=excluded.first_name, "
             "last_name=excluded.last_name, full_name=excluded.full_name, "
             "position=excluded.position, department=excluded.department, "
-            "frequency=excluded.frequency, is_active=TRUE",
+            "frequency=excluded.frequency, is_active=TRUE, "
+            "cohort_id=COALESCE(?, participants.cohort_id), "
+            "next_eligible_date=COALESCE("
+            "date(last_participation, '+' || (excluded.frequency * 7) || ' days'), "
+            "next_eligible_date, excluded.next_eligible_date)",
             (
                 user_id,
                 username,
@@ -113,13 +471,18 @@ def ensure_user(
                 position,
                 department,
                 frequency,
+                today,
+                cohort_id,
+                DEFAULT_COHORT_ID,
+                cohort_id,
             ),
         )
+        conn.execute("DELETE FROM suppressed_chats WHERE user_id = ?", (user_id,))
+        _invalidate(user_id)
         return True
 
 
-def get_user(user_id: int) -> Optional[Tuple]:
-    """Get complete user information by user_id."""
+def _fetch_user(user_id: int) -> Optional[Tuple]:
     cur = conn.execute(
         "SELECT user_id, username, first_name, last_name, full_name, "
         "position, department, frequency, last_participation, is_active "
@@ -129,36 +492,55 @@ def get_user(user_id: int) -> Optional[Tuple]:
     return cur.fetchone()
 
 
-def get_eligible_users() -> List[Tuple]:
+async def get_user(user_id: int) -> Optional[Tuple]:
+    """Get complete user information by user_id (served from profile_cache when possible)."""
+    user = profile_cache.get(user_id)
+    if user is None:
+        generation = profile_cache.generation
+        user = await _run_as("get_user", _fetch_user, user_id)
+        if user is not None:
+            profile_cache.set(user_id, user, generation)
+    return user
+
+
+@_offload
+def get_eligible_users(cohort_id: int = DEFAULT_COHORT_ID) -> List[Tuple]:
     """
-    Get users eligible for pairing based on their frequency and last participation.
+    Get users of a cohort eligible for pairing based on their frequency and last participation.
     Returns: List of (user_id, username, full_name, position, department)
     """
     today = datetime.date.today().isoformat()
     cur = conn.execute(
         "SELECT user_id, username, full_name, position, department "
         "FROM participants "
-        "WHERE is_active = TRUE AND ("
-        "  last_participation IS NULL OR "
-        "  date(last_participation, '+' || frequency || ' weeks') <= date(?)"
-        ")",
-        (today,),
+        "WHERE cohort_id = ? AND is_active = TRUE AND next_eligible_date <= ?",
+        (cohort_id, today),
     )
     return cur.fetchall()
 
 
-def get_all_users(include_inactive: bool = False) -> List[Tuple]:
-    """Get all users with basic info."""
+@_offload
+def get_all_users(
+    include_inactive: bool = False, cohort_id: Optional[int] = None
+) -> List[Tuple]:
+    """Get all users (of one cohort if `cohort_id` is given) with basic info."""
     query = (
         "SELECT user_id, username, full_name, position, department, is_active "
         "FROM participants"
     )
+    conditions, params = [], []
+    if cohort_id is not None:
+        conditions.append("cohort_id = ?")
+        params.append(cohort_id)
     if not include_inactive:
-        query += " WHERE is_active = TRUE"
-    cur = conn.execute(query)
+        conditions.append("is_active = TRUE")
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    cur = conn.execute(query, params)
     return cur.fetchall()
 
 
+@_offload
 def get_all_active_users() -> List[Tuple]:
     """
     Возвращает список активных участников.
@@ -173,6 +555,7 @@ def get_all_active_users() -> List[Tuple]:
     return cur.fetchall()
 
 
+@_offload
 def set_active(user_id: int, active: bool) -> bool:
     """Установить активность пользователя (зелёный статус).
     Возвращает True, если запись обновлена.
@@ -183,6 +566,9 @@ def set_active(user_id: int, active: bool) -> bool:
             (1 if active else 0, user_id),
         )
         updated = cur.rowcount > 0
+        if active:
+            conn.execute("DELETE FROM suppressed_chats WHERE user_id = ?", (user_id,))
+        _invalidate(user_id)
         if not updated:
             print(
                 f"[DB] set_active: пользователь {user_id} не найден, обновление не выполнено"
@@ -190,100 +576,866 @@ def set_active(user_id: int, active: bool) -> bool:
         return updated
 
 
+@_offload
+def set_frequency(user_id: int, frequency: int) -> bool:
+    """Change how often (every N weeks) a participant is paired; next eligibility follows."""
+    with conn:
+        cur = conn.execute(
+            "UPDATE participants SET frequency = ?, next_eligible_date = COALESCE("
+            "date(last_participation, '+' || (? * 7) || ' days'), next_eligible_date) "
+            "WHERE user_id = ?",
+            (frequency, frequency, user_id),
+        )
+        _invalidate(user_id)
+        return cur.rowcount > 0
+
+
+@_offload
+def set_user_cohort(user_id: int, cohort_id: int) -> bool:
+    """Move a participant to another cohort. Returns False if already there (or unknown)."""
+    with conn:
+        cur = conn.execute(
+            "UPDATE participants SET cohort_id = ?, left_out_date = NULL "
+            "WHERE user_id = ? AND cohort_id != ?",
+            (cohort_id, user_id, cohort_id),
+        )
+        _invalidate(user_id)
+        return cur.rowcount > 0
+
+
+@_offload
+def suppress_users(reasons: Dict[int, str]) -> int:
+    """
+    Deactivate participants whose chats failed permanently ({user_id: reason}),
+    record them in suppressed_chats and drop their pending reminders.
+    Returns how many participants were suppressed (unknown ids are ignored).
+    """
+    ids = [(user_id,) for user_id in reasons]
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO suppressed_chats (user_id, reason) "
+            "SELECT user_id, ? FROM participants WHERE user_id = ?",
+            [(reason, user_id) for user_id, reason in reasons.items()],
+        )
+        cur = conn.executemany(
+            "UPDATE participants SET is_active = FALSE WHERE user_id = ?", ids
+        )
+        conn.executemany("DELETE FROM reminders WHERE user_id = ?", ids)
+        _invalidate(*reasons)
+        return cur.rowcount
+
+
+def _utc_timestamp(moment: datetime.datetime) -> str:
+    return moment.astimezone(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _mark_participation(user_ids: List[int], today: str):
+    """Set last_participation/next_eligible_date (caller manages the transaction)."""
+    conn.executemany(
+        "UPDATE participants SET last_participation = ?, "
+        "next_eligible_date = date(?, '+' || (frequency * 7) || ' days'), "
+        "left_out_date = NULL "
+        "WHERE user_id = ?",
+        [(today, today, uid) for uid in user_ids],
+    )
+    _invalidate(*user_ids)
+
+
+@_offload
 def update_last_participation(user_ids: List[int]):
     """Update last participation date for given users."""
     today = datetime.date.today().isoformat()
     with conn:
+        _mark_participation(user_ids, today)
+
+
+@_offload
+def commit_round(
+    groups: List[Tuple[int, ...]],
+    forced: bool = False,
+    remind_at: Optional[datetime.datetime] = None,
+    cohort_id: int = DEFAULT_COHORT_ID,
+) -> int:
+    """
+    Save a pairing round atomically: the round row, every (user, partner)
+    direction within each group (pairs and groups of three), participation
+    dates of all placed users and (if `remind_at` is set) one reminder per
+    placed user, in one transaction.
+    Returns the round id.
+    """
+    today = datetime.date.today().isoformat()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO rounds (week_date, forced, cohort_id) VALUES (?, ?, ?)",
+            (today, forced, cohort_id),
+        )
+        round_id = cur.lastrowid
+        rows = [
+            (round_id, uid, partner_id, today, cohort_id)
+            for group in groups
+            for uid in group
+            for partner_id in group
+            if partner_id != uid
+        ]
         conn.executemany(
-            "UPDATE participants SET last_participation = ? WHERE user_id = ?",
+            "INSERT OR IGNORE INTO pairs (round_id, user_id, partner_id, week_date, cohort_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        _mark_participation([uid for group in groups for uid in group], today)
+        if remind_at is not None:
+            conn.execute(
+                "INSERT INTO reminders (round_id, user_id, partner_id, due_at) "
+                "SELECT round_id, user_id, MIN(partner_id), ? FROM pairs "
+                "WHERE round_id = ? GROUP BY user_id",
+                (_utc_timestamp(remind_at), round_id),
+            )
+    return round_id
+
+
+@_offload
+def mark_left_out(user_ids: List[int]):
+    """Remember users who got no group this round so the next one places them first."""
+    today = datetime.date.today().isoformat()
+    with conn:
+        conn.executemany(
+            "UPDATE participants SET left_out_date = ? WHERE user_id = ?",
             [(today, uid) for uid in user_ids],
         )
+        _invalidate(*user_ids)
 
 
-def deactivate_user(user_id: int) -> bool:
-    """Mark user as inactive (unsubscribed)."""
+def _latest_round_id(cohort_id: int) -> int:
+    return conn.execute(
+        "SELECT COALESCE(MAX(id), 0) FROM rounds WHERE cohort_id = ?", (cohort_id,)
+    ).fetchone()[0]
+
+
+@_offload
+def save_plan(
+    groups: List[Tuple[int, ...]],
+    leftover: List[int],
+    repeats: int = 0,
+    forced: bool = False,
+    admin_id: Optional[int] = None,
+    cohort_id: int = DEFAULT_COHORT_ID,
+) -> int:
+    """
+    Store a planned round of a cohort (groups of user ids and those left without
+    a group). Earlier plans of the cohort still waiting for a decision are
+    cancelled: only the latest preview can be committed. Returns the plan id.
+    """
     with conn:
+        conn.execute(
+            "UPDATE planned_rounds SET status = 'cancelled' "
+            "WHERE status = 'planned' AND cohort_id = ?",
+            (cohort_id,),
+        )
+        conn.execute(
+            "DELETE FROM planned_members WHERE plan_id IN "
+            "(SELECT id FROM planned_rounds WHERE status != 'planned')"
+        )
         cur = conn.execute(
-            "UPDATE participants SET is_active = FALSE WHERE user_id = ?", (user_id,)
+            "INSERT INTO planned_rounds "
+            "(admin_id, forced, base_round_id, repeats, cohort_id) VALUES (?, ?, ?, ?, ?)",
+            (admin_id, forced, _latest_round_id(cohort_id), repeats, cohort_id),
         )
-        return cur.rowcount > 0
+        plan_id = cur.lastrowid
+        rows = [
+            (plan_id, uid, group_no)
+            for group_no, group in enumerate(groups)
+            for uid in group
+        ]
+        rows.extend((plan_id, uid, None) for uid in leftover)
+        conn.executemany(
+            "INSERT INTO planned_members (plan_id, user_id, group_no) VALUES (?, ?, ?)",
+            rows,
+        )
+    return plan_id
+
+
+@_offload
+def claim_plan(plan_id: int) -> Optional[dict]:
+    """
+    Take a planned round for dispatch (status -> 'dispatching') so it can be
+    committed only once. Members are re-read from participants: users deleted or
+    deactivated since planning are dropped.
+    Returns {"forced", "repeats", "cohort_id", "groups": [[row, ...], ...],
+    "leftover": [row, ...], "stale"} with rows (user_id, username, full_name, position, department),
+    or None if the plan is gone or already decided. A stale plan (a newer round
+    was committed) is cancelled instead of claimed.
+    """
+    with conn:
+        plan = conn.execute(
+            "SELECT forced, base_round_id, repeats, cohort_id FROM planned_rounds "
+            "WHERE id = ? AND status = 'planned'",
+            (plan_id,),
+        ).fetchone()
+        if plan is None:
+            return None
+        forced, base_round_id, repeats, cohort_id = plan
+        if _latest_round_id(cohort_id) != base_round_id:
+            conn.execute(
+                "UPDATE planned_rounds SET status = 'cancelled' WHERE id = ?", (plan_id,)
+            )
+            conn.execute("DELETE FROM planned_members WHERE plan_id = ?", (plan_id,))
+            return {"stale": True}
+        conn.execute(
+            "UPDATE planned_rounds SET status = 'dispatching' WHERE id = ?", (plan_id,)
+        )
+        cur = conn.execute(
+            "SELECT m.group_no, p.user_id, p.username, p.full_name, p.position, p.department "
+            "FROM planned_members m JOIN participants p ON p.user_id = m.user_id "
+            "WHERE m.plan_id = ? AND p.is_active = TRUE "
+            "ORDER BY m.group_no",
+            (plan_id,),
+        )
+        groups: Dict[int, list] = {}
+        leftover = []
+        for group_no, *row in cur.fetchall():
+            if group_no is None:
+                leftover.append(tuple(row))
+            else:
+                groups.setdefault(group_no, []).append(tuple(row))
+    return {
+        "stale": False,
+        "forced": bool(forced),
+        "repeats": repeats,
+        "cohort_id": cohort_id,
+        "groups": list(groups.values()),
+        "leftover": leftover,
+    }
+
+
+@_offload
+def finish_plan(plan_id: int, status: str, round_id: Optional[int] = None) -> bool:
+    """
+    Close a plan: 'committed' (with the round it produced) or 'failed' after
+    dispatch, or 'cancelled' while it is still waiting. Members are no longer
+    needed either way. Returns False if the plan was not in a state that allows it.
+    """
+    expected = "planned" if status == "cancelled" else "dispatching"
+    with conn:
+        cur = conn.execute(
+            "UPDATE planned_rounds SET status = ?, round_id = ? WHERE id = ? AND status = ?",
+            (status, round_id, plan_id, expected),
+        )
+        conn.execute("DELETE FROM planned_members WHERE plan_id = ?", (plan_id,))
+    return cur.rowcount > 0
+
+
+@_offload
+def get_left_out_ids(cohort_id: Optional[int] = None) -> Set[int]:
+    """Users (of a cohort) left without a group in a previous round and not placed since."""
+    query = "SELECT user_id FROM participants WHERE left_out_date IS NOT NULL"
+    params = ()
+    if cohort_id is not None:
+        query += " AND cohort_id = ?"
+        params = (cohort_id,)
+    cur = conn.execute(query, params)
+    return {row[0] for row in cur.fetchall()}
+
+
+def _cohort_row(row) -> dict:
+    return {
+        "id": row[0],
+        "name": row[1],
+        "schedule_day": row[2],
+        "schedule_hour": row[3],
+        "schedule_minute": row[4],
+        "frequency": row[5],
+        "last_round": row[6],
+        "active": row[7],
+    }
+
+
+_COHORT_QUERY = (
+    "SELECT c.id, c.name, c.schedule_day, c.schedule_hour, c.schedule_minute, "
+    "c.frequency, "
+    "(SELECT MAX(week_date) FROM rounds r WHERE r.cohort_id = c.id AND NOT r.forced), "
+    "(SELECT COUNT(*) FROM participants p WHERE p.cohort_id = c.id AND p.is_active = TRUE) "
+    "FROM cohorts c"
+)
+
+
+@_offload
+def get_cohorts() -> List[dict]:
+    """
+    All cohorts: {"id", "name", "schedule_day", "schedule_hour", "schedule_minute"
+    (None = config default), "frequency", "last_round" (last scheduled round date),
+    "active" (active participants)}.
+    """
+    cur = conn.execute(_COHORT_QUERY + " ORDER BY c.id")
+    return [_cohort_row(row) for row in cur.fetchall()]
+
+
+@_offload
+def get_cohort(cohort_id: Optional[int] = None, name: Optional[str] = None) -> Optional[dict]:
+    """One cohort by id or by name (as in get_cohorts), or None."""
+    if name is not None:
+        cur = conn.execute(_COHORT_QUERY + " WHERE c.name = ?", (name,))
+    else:
+        cur = conn.execute(_COHORT_QUERY + " WHERE c.id = ?", (cohort_id,))
+    row = cur.fetchone()
+    return _cohort_row(row) if row else None
+
+
+def cohort_round_due(
+    last_round: Optional[str], frequency: int, day: datetime.date
+) -> bool:
+    """
+    Whether a cohort's scheduled round runs on `day`: at least `frequency`
+    weeks since its last scheduled round (one day of slack for a shifted run time).
+    """
+    if not last_round:
+        return True
+    days = (day - datetime.date.fromisoformat(last_round)).days
+    return days >= frequency * 7 - 1
+
 
+@_offload
+def save_cohort(
+    name: str,
+    schedule_day: Optional[str] = None,
+    schedule_hour: Optional[int] = None,
+    schedule_minute: Optional[int] = None,
+    frequency: int = 1,
+) -> int:
+    """Create a cohort or update the schedule of an existing one. Returns its id."""
+    with conn:
+        conn.execute(
+            "INSERT INTO cohorts (name, schedule_day, schedule_hour, schedule_minute, frequency) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET schedule_day=excluded.schedule_day, "
+            "schedule_hour=excluded.schedule_hour, schedule_minute=excluded.schedule_minute, "
+            "frequency=excluded.frequency",
+            (name, schedule_day, schedule_hour, schedule_minute, frequency),
+        )
+        # Schedules shape the round forecast cached next to the stats
+        stats_cache.clear()
+        return conn.execute("SELECT id FROM cohorts WHERE name = ?", (name,)).fetchone()[0]
 
-def get_user(user_id: int) -> Optional[Tuple]:
-    """Get complete user information by user_id."""
+
+@_offload
+def get_due_reminders(limit: int) -> List[Tuple]:
+    """
+    Reminders that are due now, oldest first, with the current profiles of
+    everyone the user was grouped with in that round.
+    Returns: List of (id, user_id, [(partner_full_name, partner_username), ...])
+    """
+    now = _utc_timestamp(datetime.datetime.now(datetime.timezone.utc))
     cur = conn.execute(
-        "SELECT user_id, username, first_name, last_name, full_name, "
-        "position, department, frequency, last_participation, is_active "
-        "FROM participants WHERE user_id = ?",
-        (user_id,),
+        "SELECT r.id, r.user_id, p.full_name, p.username "
+        "FROM ("
+        "  SELECT id, round_id, user_id, partner_id, due_at FROM reminders "
+        "  WHERE due_at <= ? ORDER BY due_at, id LIMIT ?"
+        ") r "
+        "LEFT JOIN pairs g ON g.round_id = r.round_id AND g.user_id = r.user_id "
+        "LEFT JOIN participants p ON p.user_id = COALESCE(g.partner_id, r.partner_id) "
+        "ORDER BY r.due_at, r.id",
+        (now, limit),
     )
-    return cur.fetchone()
+    reminders = []
+    for reminder_id, user_id, full_name, username in cur:
+        if not reminders or reminders[-1][0] != reminder_id:
+            reminders.append((reminder_id, user_id, []))
+        if full_name is not None:
+            reminders[-1][2].append((full_name, username))
+    return reminders
+
+
+@_offload
+def delete_reminders(reminder_ids: List[int]):
+    """Remove processed reminders from the queue."""
+    with conn:
+        conn.executemany(
+            "DELETE FROM reminders WHERE id = ?", [(rid,) for rid in reminder_ids]
+        )
+
+
+@_offload
+def deactivate_user(user_id: int) -> bool:
+    """Mark user as inactive (unsubscribed) and drop their pending reminders."""
+    with conn:
+        cur = conn.execute(
+            "UPDATE participants SET is_active = FALSE WHERE user_id = ?", (user_id,)
+        )
+        conn.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
+        _invalidate(user_id)
+        return cur.rowcount > 0
 
 
-def get_user_stats() -> dict:
-    """Get statistics about users."""
-    stats = {}
+def _compute_user_stats(today: str, recent_dates: int) -> dict:
+    # One pass over participants; the groups are few (dates x frequencies)
     cur = conn.execute(
-        "SELECT COUNT(*) as total, "
-        "SUM(CASE WHEN is_active THEN 1 ELSE 0 END) as active, "
-        "SUM(CASE WHEN last_participation IS NULL THEN 1 ELSE 0 END) as never_participated "
-        "FROM participants"
+        "SELECT is_active, frequency, last_participation, "
+        "is_active AND next_eligible_date <= ?, "
+        "user_id IN (SELECT user_id FROM suppressed_chats), "
+        "COUNT(*) "
+        "FROM participants "
+        "GROUP BY 1, 2, 3, 4, 5",
+        (today,),
     )
-    row = cur.fetchone()
-    stats.update(zip(("total", "active", "never_participated"), row))
+    stats = {
+        "total": 0,
+        "active": 0,
+        "eligible": 0,
+        "never_participated": 0,
+        "suppressed": 0,
+        "frequency_distribution": {},
+        "recent_participation": {},
+    }
+    frequencies, dates = stats["frequency_distribution"], stats["recent_participation"]
+    for is_active, frequency, last_participation, eligible, suppressed, count in cur:
+        stats["total"] += count
+        if suppressed:
+            stats["suppressed"] += count
+        if is_active:
+            stats["active"] += count
+        if eligible:
+            stats["eligible"] += count
+        frequencies[frequency] = frequencies.get(frequency, 0) + count
+        if last_participation is None:
+            stats["never_participated"] += count
+        else:
+            dates[last_participation] = dates.get(last_participation, 0) + count
 
-    cur = conn.execute(
-        "SELECT frequency, COUNT(*) FROM participants "
-        "WHERE is_active = TRUE GROUP BY frequency"
+    stats["frequency_distribution"] = dict(sorted(frequencies.items()))
+    stats["recent_participation"] = dict(
+        sorted(dates.items(), reverse=True)[:recent_dates]
     )
-    stats["frequency_distribution"] = dict(cur.fetchall())
+    return stats
+
 
+async def get_user_stats(recent_dates: int = 5) -> dict:
+    """
+    Statistics about users (cached for STATS_CACHE_TTL seconds):
+    total, active, eligible, never_participated, suppressed, frequency_distribution
+    {frequency: count}, recent_participation {date: count}, newest first.
+    """
+    today = datetime.date.today().isoformat()
+    key = (today, recent_dates)
+    stats = stats_cache.get(key)
+    if stats is None:
+        generation = stats_cache.generation
+        stats = await _run_as("get_user_stats", _compute_user_stats, today, recent_dates)
+        stats_cache.set(key, stats, generation)
     return stats
 
 
+def project_round_sizes(
+    histogram: Dict[Tuple[str, int], int],
+    run_dates: List[Optional[datetime.date]],
+) -> List[int]:
+    """
+    Expected size of each round of a cohort, assuming everyone eligible is
+    paired. run_dates[k] is the date of week k's round (None = no round that
+    week); histogram is {(next_eligible_date, frequency): count}. A user joins
+    the first round on or after next_eligible_date and becomes eligible again
+    `frequency` weeks after it, as commit_round sets.
+    """
+    sizes = [0] * len(run_dates)
+    for (eligible_from, frequency), count in histogram.items():
+        due = datetime.date.fromisoformat(eligible_from)
+        for week, day in enumerate(run_dates):
+            if day is not None and day >= due:
+                sizes[week] += count
+                due = day + datetime.timedelta(weeks=max(frequency or 1, 1))
+    return sizes
+
+
+@_offload
+def get_cohort_eligibility() -> Dict[int, dict]:
+    """
+    Forecast input, one pass over active participants:
+    {cohort_id: {"active": count, "histogram": {(next_eligible_date, frequency): count}}}.
+    Dates already passed (or missing) are folded into today.
+    """
+    today = datetime.date.today().isoformat()
+    cur = conn.execute(
+        "SELECT cohort_id, MAX(COALESCE(next_eligible_date, ?), ?), frequency, COUNT(*) "
+        "FROM participants WHERE is_active = TRUE "
+        "GROUP BY 1, 2, 3",
+        (today, today),
+    )
+    cohorts: Dict[int, dict] = {}
+    for cohort_id, eligible_from, frequency, count in cur:
+        cohort = cohorts.setdefault(cohort_id, {"active": 0, "histogram": {}})
+        cohort["active"] += count
+        cohort["histogram"][eligible_from, frequency] = count
+    return cohorts
+
+
+@_offload
 def delete_user(user_id: int) -> bool:
-    """Completely delete a user from the database."""
+    """Completely delete a user from the database, with their pending reminders."""
     with conn:
         cur = conn.execute("DELETE FROM participants WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM reminders WHERE user_id = ?", (user_id,))
+        _invalidate(user_id)
         return cur.rowcount > 0
 
 
+@_offload
 def reactivate_user(user_id: int) -> bool:
     """Reactivate a previously deactivated user."""
     with conn:
         cur = conn.execute(
             "UPDATE participants SET is_active = TRUE WHERE user_id = ?", (user_id,)
         )
+        conn.execute("DELETE FROM suppressed_chats WHERE user_id = ?", (user_id,))
+        _invalidate(user_id)
         return cur.rowcount > 0
 
 
-def get_current_partner(user_id: int) -> Optional[dict]:
+@_offload
+def get_pair_history(
+    weeks: int, cohort_id: int = DEFAULT_COHORT_ID
+) -> List[Tuple[int, int]]:
     """
-    Возвращает словарь с информацией о текущем напарнике пользователя.
-    Формат: {"user_id": ..., "username": ..., "full_name": ...}
+    Pairs of a cohort from the last `weeks` weeks, each pair once.
+    Returns: List of (user_id, partner_id)
     """
-    try:
+    since = (datetime.date.today() - datetime.timedelta(weeks=weeks)).isoformat()
+    cur = conn.execute(
+        "SELECT user_id, partner_id FROM pairs "
+        "WHERE cohort_id = ? AND week_date >= ? AND user_id < partner_id",
+        (cohort_id, since),
+    )
+    return cur.fetchall()
+
+
+@_offload
+def get_current_partners(user_id: int) -> List[dict]:
+    """
+    Напарники пользователя в его последнем раунде (один или двое для группы из трёх).
+    Формат: [{"user_id": ..., "username": ..., "full_name": ...}, ...]
+    """
+    cur = conn.execute(
+        "SELECT partner.user_id, partner.username, partner.full_name "
+        "FROM pairs JOIN participants partner ON partner.user_id = pairs.partner_id "
+        "WHERE pairs.user_id = ? AND pairs.round_id = ("
+        "  SELECT round_id FROM pairs WHERE user_id = ? "
+        "  ORDER BY week_date DESC, round_id DESC LIMIT 1"
+        ")",
+        (user_id, user_id),
+    )
+    return [
+        {"user_id": row[0], "username": row[1], "full_name": row[2]}
+        for row in cur.fetchall()
+    ]
+
+
+async def get_current_partners_bulk(
+    batch_size: int = 500,
+) -> AsyncIterator[Tuple[int, List[dict]]]:
+    """
+    Стримит (user_id, напарники) для всех активных участников одним запросом.
+    Напарники в формате get_current_partners (пустой список, если пары ещё не было).
+    """
+    query = (
+        "SELECT p.user_id, partner.user_id, partner.username, partner.full_name "
+        "FROM participants p "
+        "LEFT JOIN ("
+        "  SELECT user_id, partner_id, "
+        "  RANK() OVER ("
+        "    PARTITION BY user_id ORDER BY week_date DESC, round_id DESC"
+        "  ) AS rn "
+        "  FROM pairs"
+        ") latest ON latest.user_id = p.user_id AND latest.rn = 1 "
+        "LEFT JOIN participants partner ON partner.user_id = latest.partner_id "
+        "WHERE p.is_active = TRUE "
+        "ORDER BY p.user_id"
+    )
+    # Rows of one user are adjacent but may straddle a chunk boundary
+    current, partners = None, []
+    async for rows in _stream(query, batch_size=batch_size):
+        for user_id, partner_id, username, full_name in rows:
+            if user_id != current:
+                if current is not None:
+                    yield current, partners
+                current, partners = user_id, []
+            if partner_id is not None:
+                partners.append(
+                    {"user_id": partner_id, "username": username, "full_name": full_name}
+                )
+    if current is not None:
+        yield current, partners
+
+
+def _keyset_page(
+    query: str,
+    conditions: List[str],
+    params: list,
+    limit: int,
+    after: Optional[int],
+    before: Optional[int],
+) -> Tuple[List[Tuple], bool, bool]:
+    """
+    Keyset pagination over participants ordered by (full_name, user_id): rows
+    following the participant `after` or preceding the participant `before`
+    (first page if neither is given). Returns (rows, has_prev, has_next).
+    """
+    conditions, params = list(conditions), list(params)
+    key = "(SELECT full_name, user_id FROM participants WHERE user_id = ?)"
+    if after is not None:
+        conditions.append(f"(full_name, user_id) > {key}")
+        params.append(after)
+    elif before is not None:
+        conditions.append(f"(full_name, user_id) < {key}")
+        params.append(before)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    order = "full_name DESC, user_id DESC" if before is not None else "full_name, user_id"
+    cur = conn.execute(f"{query} ORDER BY {order} LIMIT ?", (*params, limit + 1))
+    rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        return rows[::-1], more, True
+    return rows, after is not None, more
+
+
+@_offload
+def get_participants_page(
+    limit: int, after: Optional[int] = None, before: Optional[int] = None
+) -> Tuple[List[Tuple], bool, bool]:
+    """
+    One page of participants ordered by (full_name, user_id), keyset-paginated
+    (see _keyset_page). Returns (rows, has_prev, has_next); rows are
+    (user_id, username, full_name, frequency, last_participation, is_active, eligible)
+    """
+    today = datetime.date.today().isoformat()
+    query = (
+        "SELECT user_id, username, full_name, frequency, last_participation, "
+        "is_active, is_active AND next_eligible_date <= ? FROM participants"
+    )
+    return _keyset_page(query, [], [today], limit, after, before)
+
+
+@_offload
+def search_participants(
+    text: str, limit: int, after: Optional[int] = None, before: Optional[int] = None
+) -> Tuple[List[Tuple], bool, bool]:
+    """
+    Participants whose name, username or department contain words starting
+    with every word of `text`, keyset-paginated like get_participants_page.
+    Returns (rows, has_prev, has_next); rows are
+    (user_id, username, full_name, department, is_active)
+    """
+    words = [w.strip('"@').strip() for w in text.split()]
+    words = [w for w in words if w]
+    if not words:
+        return [], False, False
+
+    query = (
+        "SELECT user_id, username, full_name, department, is_active FROM participants"
+    )
+    if _fts_enabled:
+        # Each word is an FTS5 string; quotes inside it are doubled
+        match = " ".join('"{}"*'.format(w.replace('"', '""')) for w in words)
+        conditions = [
+            "user_id IN (SELECT rowid FROM participants_fts WHERE participants_fts MATCH ?)"
+        ]
+        params = [match]
+    else:
+        conditions, params = [], []
+        for w in words:
+            conditions.append(
+                "(full_name LIKE ? OR username LIKE ? OR department LIKE ?)"
+            )
+            params += [f"%{w}%"] * 3
+    return _keyset_page(query, conditions, params, limit, after, before)
+
+
+def stream_participants_export(
+    active_only: bool = False, department: Optional[str] = None, batch_size: int = 1000
+) -> AsyncIterator[List[Tuple]]:
+    """
+    Participants for the admin export in chunks, ordered by name.
+    Rows: (user_id, username, full_name, position, department, frequency,
+    last_participation, is_active)
+    """
+    query = (
+        "SELECT user_id, username, full_name, position, department, frequency, "
+        "last_participation, is_active FROM participants"
+    )
+    conditions, params = [], []
+    if active_only:
+        conditions.append("is_active = TRUE")
+    if department is not None:
+        conditions.append("department = ?")
+        params.append(department)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY full_name"
+    return _stream(query, tuple(params), batch_size)
+
+
+def stream_pairs_export(batch_size: int = 1000) -> AsyncIterator[List[Tuple]]:
+    """
+    Pair history for the admin export in chunks, newest round first, each pair once.
+    Rows: (round_id, week_date, user_id, full_name, partner_id, partner_full_name)
+    """
+    return _stream(
+        "SELECT pairs.round_id, pairs.week_date, pairs.user_id, u.full_name, "
+        "pairs.partner_id, p.full_name FROM pairs "
+        "LEFT JOIN participants u ON u.user_id = pairs.user_id "
+        "LEFT JOIN participants p ON p.user_id = pairs.partner_id "
+        "WHERE pairs.user_id < pairs.partner_id "
+        "ORDER BY pairs.week_date DESC, pairs.round_id DESC",
+        batch_size=batch_size,
+    )
+
+
+@_offload
+def get_departments() -> List[Tuple[str, int]]:
+    """Departments with participant counts: List of (department, count), largest first."""
+    cur = conn.execute(
+        "SELECT department, COUNT(*) FROM participants "
+        "GROUP BY department ORDER BY COUNT(*) DESC, department"
+    )
+    return cur.fetchall()
+
+
+@_offload
+def create_broadcast(admin_id: int, from_chat_id: int, message_id: int) -> int:
+    """
+    Create a broadcast job for all currently active users.
+    Returns the job id.
+    """
+    with conn:
+        total, max_user_id = conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(user_id), 0) FROM participants "
+            "WHERE is_active = TRUE"
+        ).fetchone()
         cur = conn.execute(
-            "SELECT partner_id FROM pairs WHERE user_id = ? ORDER BY week_date DESC LIMIT 1",
-            (user_id,),
+            "INSERT INTO broadcasts (admin_id, from_chat_id, message_id, max_user_id, total) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (admin_id, from_chat_id, message_id, max_user_id, total),
         )
-        row = cur.fetchone()
-        if not row:
-            return None
-        partner_id = row[0]
-        partner = get_user(partner_id)
-        if not partner:
-            return None
-        return {
-            "user_id": partner[0],
-            "username": partner[1],
-            "full_name": partner[4],
-        }
-    except Exception as e:
-        print(f"get_current_partner error: {e}")
+        return cur.lastrowid
+
+
+@_offload
+def set_broadcast_progress_message(broadcast_id: int, message_id: int):
+    """Remember the admin's message that shows live progress of the job."""
+    with conn:
+        conn.execute(
+            "UPDATE broadcasts SET progress_message_id = ? WHERE id = ?",
+            (message_id, broadcast_id),
+        )
+
+
+@_offload
+def get_broadcast(broadcast_id: int) -> Optional[dict]:
+    """Get broadcast job state as a dict."""
+    cur = conn.execute(
+        "SELECT id, admin_id, from_chat_id, message_id, progress_message_id, status, "
+        "cursor, max_user_id, total, sent, failed FROM broadcasts WHERE id = ?",
+        (broadcast_id,),
+    )
+    row = cur.fetchone()
+    if not row:
         return None
+    return dict(zip((d[0] for d in cur.description), row))
+
+
+@_offload
+def get_running_broadcasts() -> List[int]:
+    """Ids of broadcast jobs that have not finished (to resume after restart)."""
+    cur = conn.execute("SELECT id FROM broadcasts WHERE status = 'running' ORDER BY id")
+    return [row[0] for row in cur.fetchall()]
+
+
+@_offload
+def get_broadcast_recipients(broadcast_id: int, limit: int) -> List[int]:
+    """Next batch of recipients after the job's cursor."""
+    cur = conn.execute(
+        "SELECT p.user_id FROM participants p, broadcasts b "
+        "WHERE b.id = ? AND p.is_active = TRUE "
+        "AND p.user_id > b.cursor AND p.user_id <= b.max_user_id "
+        "ORDER BY p.user_id LIMIT ?",
+        (broadcast_id, limit),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+@_offload
+def advance_broadcast(
+    broadcast_id: int, cursor: int, sent: int, failures: List[Tuple[int, str]]
+):
+    """Record a delivered batch and move the cursor in one transaction."""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO broadcast_failures (broadcast_id, user_id, error) "
+            "VALUES (?, ?, ?)",
+            [(broadcast_id, uid, error) for uid, error in failures],
+        )
+        conn.execute(
+            "UPDATE broadcasts SET cursor = ?, sent = sent + ?, failed = failed + ? "
+            "WHERE id = ?",
+            (cursor, sent, len(failures), broadcast_id),
+        )
+
+
+@_offload
+def finish_broadcast(broadcast_id: int, status: str = "done"):
+    """Mark broadcast job as finished."""
+    with conn:
+        conn.execute(
+            "UPDATE broadcasts SET status = ?, finished_at = CURRENT_TIMESTAMP "
+            "WHERE id = ?",
+            (status, broadcast_id),
+        )
+
+
+@_offload
+def get_broadcast_failures(broadcast_id: int, limit: int = 10) -> List[int]:
+    """User ids the broadcast could not be delivered to."""
+    cur = conn.execute(
+        "SELECT user_id FROM broadcast_failures WHERE broadcast_id = ? "
+        "ORDER BY user_id LIMIT ?",
+        (broadcast_id, limit),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+@_offload
+def get_fsm_record(key: str) -> Optional[Tuple]:
+    """Stored FSM record: (state, data_json, updated_at) or None."""
+    cur = conn.execute(
+        "SELECT state, data, updated_at FROM fsm_states WHERE key = ?", (key,)
+    )
+    return cur.fetchone()
+
+
+@_offload
+def save_fsm_records(
+    records: List[Tuple[str, Optional[str], str, float]], deleted: List[str]
+):
+    """Write a batch of (key, state, data_json, updated_at) and drop emptied keys."""
+    with conn:
+        conn.executemany(
+            "INSERT INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET state=excluded.state, "
+            "data=excluded.data, updated_at=excluded.updated_at",
+            records,
+        )
+        conn.executemany(
+            "DELETE FROM fsm_states WHERE key = ?", [(key,) for key in deleted]
+        )
+
+
+@_offload
+def purge_fsm_records(before: float) -> int:
+    """Delete FSM records idle since before `before` (unix time)."""
+    with conn:
+        cur = conn.execute("DELETE FROM fsm_states WHERE updated_at < ?", (before,))
+        return cur.rowcount
 
 
 def close_connection():
-    """Properly close database connection."""
-    conn.close()
+    """Properly close database connection and stop the DB thread."""
+    _executor.submit(conn.close).result()
+    _executor.shutdown()
@@ -0,0 +1,83 @@
+"""
+Export module: streams query results into a CSV document for Telegram.
+
+Rows are written chunk by chunk through the csv module into a spooled
+temporary file (kept in memory while small, moved to disk when large) and
+optionally gzip-compressed, so memory stays flat regardless of table size.
+"""
+
+import csv
+import gzip
+import io
+import tempfile
+from typing import AsyncGenerator, AsyncIterator, List, Sequence, Tuple
+
+from aiogram.types import InputFile
+
+# Bigger exports spill from memory to a temporary file on disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+PARTICIPANTS_HEADER = (
+    "ID",
+    "Username",
+    "Full Name",
+    "Position",
+    "Department",
+    "Frequency",
+    "Last Participation",
+    "Active",
+)
+PAIRS_HEADER = ("Round", "Date", "User ID", "User", "Partner ID", "Partner")
+
+
+class SpooledInputFile(InputFile):
+    """InputFile that uploads an already written (spooled) binary file."""
+
+    def __init__(self, file, filename: str, **kwargs):
+        super().__init__(filename=filename, **kwargs)
+        self.file = file
+
+    async def read(self, bot) -> AsyncGenerator[bytes, None]:
+        self.file.seek(0)
+        while chunk := self.file.read(self.chunk_size):
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+async def write_csv(
+    chunks: AsyncIterator[List[Tuple]], header: Sequence[str], compress: bool = False
+) -> Tuple[tempfile.SpooledTemporaryFile, int]:
+    """
+    Write header and all row chunks as ';'-separated CSV (UTF-8 with BOM for Excel).
+    Returns the binary file positioned at its end and the number of data rows.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    raw = gzip.GzipFile(fileobj=spool, mode="wb") if compress else spool
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text, delimiter=";")
+    writer.writerow(header)
+
+    count = 0
+    async for rows in chunks:
+        writer.writerows(rows)
+        count += len(rows)
+
+    text.flush()
+    text.detach()
+    if compress:
+        raw.close()  # writes the gzip trailer, leaves `spool` open
+    return spool, count
+
+
+async def export_document(
+    chunks: AsyncIterator[List[Tuple]],
+    header: Sequence[str],
+    name: str,
+    compress: bool = False,
+) -> Tuple[SpooledInputFile, int]:
+    """Build an uploadable CSV (or .csv.gz) document and its row count."""
+    spool, count = await write_csv(chunks, header, compress)
+    filename = f"{name}.csv.gz" if compress else f"{name}.csv"
+    return SpooledInputFile(spool, filename), count
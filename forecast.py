@@ -0,0 +1,109 @@
+"""
+Forecast module: projects the next weeks of scheduled pairing rounds into
+participants, outgoing messages, queued reminders and delivery time.
+
+Eligibility comes from one pass over active participants
+(db.get_cohort_eligibility); each cohort is projected on the dates its
+scheduled round is due (db.project_round_sizes) and the weeks are summed.
+"""
+
+import datetime
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import db
+from config import MATCH_TRIADS, SEND_RATE
+
+
+@dataclass
+class WeekForecast:
+    # дата первого раунда недели
+    start: datetime.date
+    # участники раундов недели: каждый получает сообщение о паре (или «без пары»)
+    eligible: int = 0
+    # попали в пары и тройки: столько напоминаний ставится в очередь
+    placed: int = 0
+    # активные участники получают еженедельное напоминание
+    active: int = 0
+
+    @property
+    def messages(self) -> int:
+        return self.eligible + self.placed + self.active
+
+    @property
+    def pairing_seconds(self) -> float:
+        """Время рассылки результатов жеребьевки при SEND_RATE."""
+        return self.eligible / SEND_RATE
+
+
+def placed_count(eligible: int) -> int:
+    """Сколько участников раунда из `eligible` попадут в группы."""
+    if eligible < 2:
+        return 0
+    if MATCH_TRIADS or eligible % 2 == 0:
+        return eligible
+    return eligible - 1
+
+
+def cohort_run_dates(
+    cohort: dict, first_run: datetime.date, weeks: int
+) -> List[Optional[datetime.date]]:
+    """
+    Даты плановых раундов когорты по неделям, начиная с ближайшего запуска
+    `first_run`; None — на этой неделе раунд пропускается (частота когорты).
+    """
+    runs = []
+    last = cohort["last_round"]
+    for week in range(weeks):
+        day = first_run + datetime.timedelta(weeks=week)
+        if db.cohort_round_due(last, cohort["frequency"], day):
+            runs.append(day)
+            last = day.isoformat()
+        else:
+            runs.append(None)
+    return runs
+
+
+async def build_forecast(
+    cohorts: List[dict], first_runs: Dict[int, datetime.date], weeks: int
+) -> List[WeekForecast]:
+    """
+    Прогноз на `weeks` недель вперёд. `first_runs` — дата ближайшего
+    планового запуска каждой когорты по её id; неделя k начинается с
+    самого раннего из них + k недель.
+    """
+    start = min(first_runs.values(), default=datetime.date.today())
+    rows = [
+        WeekForecast(start=start + datetime.timedelta(weeks=week))
+        for week in range(weeks)
+    ]
+    eligibility = await db.get_cohort_eligibility()
+    for cohort in cohorts:
+        data = eligibility.get(cohort["id"])
+        if data is None:
+            continue
+        run_dates = cohort_run_dates(cohort, first_runs[cohort["id"]], weeks)
+        sizes = db.project_round_sizes(data["histogram"], run_dates)
+        for row, size in zip(rows, sizes):
+            row.eligible += size
+            row.placed += placed_count(size)
+            row.active += data["active"]
+    return rows
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 3600:
+        return f"{seconds // 60}:{seconds % 60:02d}"
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def render_table(rows: List[WeekForecast]) -> str:
+    """Компактная моноширинная таблица по неделям (для <pre>)."""
+    lines = [f"{'Дата':<6}{'Раунд':>7}{'Сообщ.':>8}{'Напом.':>7}{'Время':>8}"]
+    for row in rows:
+        lines.append(
+            f"{row.start:%d.%m} {row.eligible:>7}{row.messages:>8}"
+            f"{row.placed:>7}{format_duration(row.pairing_seconds):>8}"
+        )
+    return "\n".join(lines)
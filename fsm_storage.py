@@ -0,0 +1,131 @@
+"""
+FSM storage module: SQLite-backed aiogram storage with an in-process cache.
+
+Reads are served from an LRU cache (loading from SQLite on a miss), writes
+only mark the record dirty; a background task flushes dirty records in one
+batch every FSM_FLUSH_INTERVAL seconds. Records idle longer than
+FSM_TTL_SECONDS are treated as empty and purged from the database.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+import db
+from config import FSM_CACHE_SIZE, FSM_FLUSH_INTERVAL, FSM_TTL_SECONDS
+
+
+@dataclass
+class _Record:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = field(default_factory=time.time)
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(
+        self,
+        cache_size: int = FSM_CACHE_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        ttl: float = FSM_TTL_SECONDS,
+    ):
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._cache: "OrderedDict[str, _Record]" = OrderedDict()
+        # Written but not yet flushed; survives LRU eviction until the next flush
+        self._dirty: Dict[str, _Record] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return f"{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id}:{key.destiny}"
+
+    def _remember(self, key: str, record: _Record):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: str) -> _Record:
+        record = self._cache.get(key) or self._dirty.get(key)
+        if record is None:
+            row = await db.get_fsm_record(key)
+            record = _Record()
+            if row:
+                record = _Record(row[0], json.loads(row[1]), row[2])
+        if record.updated_at < time.time() - self.ttl:
+            record = _Record()
+        self._remember(key, record)
+        return record
+
+    def _touch(self, key: str, record: _Record):
+        record.updated_at = time.time()
+        self._dirty[key] = record
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        skey = self._key(key)
+        record = await self._load(skey)
+        record.state = state.state if isinstance(state, State) else state
+        self._touch(skey, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(self._key(key))).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        skey = self._key(key)
+        record = await self._load(skey)
+        record.data = data.copy()
+        self._touch(skey, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._load(self._key(key))).data.copy()
+
+    async def flush(self):
+        """Write all dirty records to SQLite in one transaction."""
+        now = time.time()
+        if now - self._last_purge >= self.ttl / 24:
+            self._last_purge = now
+            purged = await db.purge_fsm_records(now - self.ttl)
+            if purged:
+                logging.info(f"Purged {purged} expired FSM records")
+
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        records, deleted = [], []
+        for key, record in dirty.items():
+            if record.state is None and not record.data:
+                deleted.append(key)
+            else:
+                records.append(
+                    (key, record.state, json.dumps(record.data), record.updated_at)
+                )
+        try:
+            await db.save_fsm_records(records, deleted)
+        except Exception as e:
+            logging.exception(f"FSM flush failed, will retry: {e}")
+            for key, record in dirty.items():
+                self._dirty.setdefault(key, record)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
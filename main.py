@@ -1,17 +1,27 @@
 """
 Main entry point for the Random Coffee Telegram Bot.
-Sets up the bot, scheduler, and starts polling.
+Sets up the bot, scheduler, and starts polling (or the webhook server).
 """
 
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from zoneinfo import ZoneInfo
 
-from config import BOT_TOKEN, SCHEDULE_DAY, SCHEDULE_HOUR, SCHEDULE_MINUTE
+from config import (
+    BOT_MODE,
+    BOT_TOKEN,
+    METRICS_HOST,
+    METRICS_PORT,
+    REMINDER_SWEEP_SECONDS,
+    SCHEDULE_TIMEZONE,
+)
 import db  # initialize database connection
-from admin_handlers import admin_router, pair_users, pair_users_monday
-from user_handlers import user_router, send_weekly_reminders
+import broadcast
+import metrics
+import webhook
+from fsm_storage import SQLiteStorage
+from admin_handlers import admin_router, schedule_rounds
+from user_handlers import user_router, send_due_reminders, send_weekly_reminders
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 logging.basicConfig(level=logging.INFO)
@@ -20,29 +30,35 @@ logging.basicConfig(level=logging.INFO)
 async def main():
     # Initialize bot and dispatcher
     bot = Bot(token=BOT_TOKEN, parse_mode="HTML")
-    dp = Dispatcher()
+    # Count and time every Bot API request
+    bot.session.middleware(metrics.RequestMetricsMiddleware())
+    # FSM states (registration progress) persist in SQLite behind an in-memory cache
+    dp = Dispatcher(storage=SQLiteStorage())
 
-    # Register user and admin routers with the dispatcher
-    dp.include_router(user_router)
+    # Time the whole dispatch of each update, routing included
+    dp.update.outer_middleware(metrics.DispatchMetricsMiddleware())
+
+    # Admin router first: its router-level filter drops non-admin updates with a
+    # single set lookup, and admins reach admin handlers without passing user ones
     dp.include_router(admin_router)
+    dp.include_router(user_router)
+    for router in (admin_router, user_router):
+        router.message.middleware(metrics.HandlerMetricsMiddleware())
+        router.callback_query.middleware(metrics.HandlerMetricsMiddleware())
 
     # Set up the scheduler for weekly pairings
-    scheduler = AsyncIOScheduler(timezone=ZoneInfo("Europe/Moscow"))
-    # Schedule the pairing job at the configured day/time every week
+    scheduler = AsyncIOScheduler(timezone=SCHEDULE_TIMEZONE)
+    # Handlers that change cohort schedules get it as the `scheduler` argument
+    dp["scheduler"] = scheduler
+    # One pairing job per distinct cohort schedule; cohorts sharing it run in parallel
+    schedules = {}
     try:
-        scheduler.add_job(
-            pair_users_monday,
-            "cron",
-            args=[bot],
-            day_of_week=SCHEDULE_DAY,
-            hour=SCHEDULE_HOUR,
-            minute=SCHEDULE_MINUTE,
-        )
+        schedules = await schedule_rounds(scheduler, bot)
     except Exception as e:
-        logging.error(f"Failed to schedule pairing job: {e}")
+        logging.error(f"Failed to schedule pairing jobs: {e}")
     try:
         scheduler.add_job(
-            send_weekly_reminders,
+            metrics.track_job(send_weekly_reminders),
             "cron",
             args=[bot],
             day_of_week="wed",
@@ -55,18 +71,51 @@ async def main():
         )
     except Exception as e:
         logging.error(f"Failed to schedule weekly reminder job: {e}")
+    try:
+        # Один периодический разборщик очереди напоминаний вместо задачи на каждую пару
+        scheduler.add_job(
+            metrics.track_job(send_due_reminders),
+            "interval",
+            args=[bot],
+            seconds=REMINDER_SWEEP_SECONDS,
+            id="due_reminders_sweeper",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+    except Exception as e:
+        logging.error(f"Failed to schedule reminder sweeper: {e}")
     scheduler.start()
-    logging.info(
-        f"Scheduler started: weekly pairing every {SCHEDULE_DAY} at {SCHEDULE_HOUR:02d}:{SCHEDULE_MINUTE:02d}."
-    )
+    for (day, hour, minute), cohort_ids in schedules.items():
+        logging.info(
+            f"Scheduler started: pairing of cohorts {cohort_ids} every {day} at {hour:02d}:{minute:02d}."
+        )
+
+    metrics_runner = None
+    if METRICS_PORT:
+        try:
+            metrics_runner = await metrics.start_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            logging.error(f"Failed to start metrics endpoint: {e}")
+
+    # Resume broadcasts interrupted by a previous shutdown
+    await broadcast.resume_broadcasts(bot)
 
-    # Start polling for bot updates (runs until stopped)
+    # Receive updates via webhook if configured, otherwise poll (runs until stopped)
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == "webhook":
+            await webhook.run_webhook(dp, bot)
+        else:
+            # getUpdates conflicts with a webhook left from a previous webhook run
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
-        # Shutdown scheduler and close DB connection on exit
+        # Shutdown scheduler, flush FSM states and close DB connection on exit
         scheduler.shutdown(wait=False)
-        db.conn.close()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await dp.storage.close()
+        db.close_connection()
 
 
 if __name__ == "__main__":
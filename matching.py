@@ -0,0 +1,144 @@
+"""
+Matching module: history-aware pairing of participants.
+Past partners (and optionally colleagues from the same department) are
+penalised; a randomised greedy pass followed by pair swaps gives a
+near-optimal matching in roughly linear time. With an odd number of
+participants the one left over joins the cheapest pair as a group of three.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Penalty weights: a repeat partner is always worse than a same-department one
+REPEAT_PENALTY = 10
+DEPARTMENT_PENALTY = 1
+
+# How many upcoming unmatched candidates the greedy pass looks at per user
+WINDOW = 32
+# Random partner pairs tried when improving each penalised pair
+SWAP_TRIES = 64
+
+
+@dataclass
+class Matching:
+    # Pairs, plus at most one group of three when the count is odd
+    groups: List[Tuple[tuple, ...]] = field(default_factory=list)
+    leftover: List[tuple] = field(default_factory=list)
+    repeats: int = 0
+    same_department: int = 0
+
+
+def build_history(rows: Iterable[Tuple[int, int]]) -> Dict[int, Set[int]]:
+    """Sparse adjacency sets {user_id: {past partner ids}} from (user_id, partner_id) rows."""
+    history: Dict[int, Set[int]] = {}
+    for uid, partner_id in rows:
+        history.setdefault(uid, set()).add(partner_id)
+        history.setdefault(partner_id, set()).add(uid)
+    return history
+
+
+def match_users(
+    users: Sequence[tuple],
+    history: Dict[int, Set[int]],
+    avoid_same_department: bool = False,
+    seed: Optional[int] = None,
+    triads: bool = True,
+    priority: Collection[int] = (),
+) -> Matching:
+    """
+    Pair users minimising repeat partners (and same-department pairs if asked).
+    `users` are rows as returned by db.get_eligible_users:
+    (user_id, username, full_name, position, department).
+    An odd user out joins a pair as a third member if `triads`, otherwise is
+    returned in `leftover`; users in `priority` (left out last time) are
+    matched first so they are never the one left over.
+    The same `seed` with the same input always gives the same matching.
+    """
+    rng = random.Random(seed)
+    n = len(users)
+    ids = [u[0] for u in users]
+    if avoid_same_department:
+        departments = [
+            (u[4] or "").strip().lower() if len(u) > 4 else "" for u in users
+        ]
+    else:
+        departments = None
+    empty: Set[int] = set()
+    partners = [history.get(uid, empty) for uid in ids]
+
+    def cost(a: int, b: int) -> int:
+        c = REPEAT_PENALTY if ids[b] in partners[a] else 0
+        if departments is not None and departments[a] and departments[a] == departments[b]:
+            c += DEPARTMENT_PENALTY
+        return c
+
+    order = list(range(n))
+    rng.shuffle(order)
+    if priority:
+        order.sort(key=lambda i: ids[i] not in priority)
+
+    # Greedy pass: match each user with the cheapest of the next WINDOW unmatched
+    matched = bytearray(n)
+    pairs: List[List[int]] = []
+    for pos, a in enumerate(order):
+        if matched[a]:
+            continue
+        best, best_cost, seen = -1, None, 0
+        for k in range(pos + 1, n):
+            b = order[k]
+            if matched[b]:
+                continue
+            c = cost(a, b)
+            if best_cost is None or c < best_cost:
+                best, best_cost = b, c
+                if c == 0:
+                    break
+            seen += 1
+            if seen >= WINDOW:
+                break
+        if best < 0:
+            break
+        matched[a] = matched[best] = 1
+        pairs.append([a, best])
+
+    # Improvement pass: swap partners between a penalised pair and random others
+    if len(pairs) > 1:
+        for i in range(len(pairs)):
+            a, b = pairs[i]
+            current = cost(a, b)
+            tries = 0
+            while current and tries < SWAP_TRIES:
+                tries += 1
+                j = rng.randrange(len(pairs))
+                if j == i:
+                    continue
+                c, d = pairs[j]
+                before = current + cost(c, d)
+                if cost(a, c) + cost(b, d) < before:
+                    pairs[i], pairs[j] = [a, c], [b, d]
+                elif cost(a, d) + cost(b, c) < before:
+                    pairs[i], pairs[j] = [a, d], [b, c]
+                else:
+                    continue
+                a, b = pairs[i]
+                current = cost(a, b)
+
+    groups = [tuple(pair) for pair in pairs]
+    leftover = [i for i in range(n) if not matched[i]]
+    if triads and leftover and groups:
+        # The odd one out joins the pair it fits best
+        c = leftover.pop()
+        i = min(range(len(groups)), key=lambda k: cost(c, groups[k][0]) + cost(c, groups[k][1]))
+        groups[i] += (c,)
+
+    result = Matching(leftover=[users[i] for i in leftover])
+    for group in groups:
+        for k, a in enumerate(group):
+            for b in group[k + 1 :]:
+                if ids[b] in partners[a]:
+                    result.repeats += 1
+                if departments is not None and departments[a] and departments[a] == departments[b]:
+                    result.same_department += 1
+        result.groups.append(tuple(users[i] for i in group))
+    return result
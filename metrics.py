@@ -0,0 +1,276 @@
+"""
+Metrics module: in-process counters and histograms exposed in the Prometheus
+text exposition format on a local HTTP endpoint (GET /metrics).
+
+Instrumented: full dispatch of every update (including router filters),
+handler latency (aiogram middleware), DB calls (db._run),
+every Telegram Bot API request and its outcome (session middleware),
+sender delivery results and scheduled job durations.
+"""
+
+import functools
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Observed from the event loop and the DB thread
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Value read from a callback at scrape time (e.g. cache sizes and counters)."""
+
+    def __init__(
+        self, name: str, documentation: str, read: Callable[[], float], kind: str = "gauge"
+    ):
+        super().__init__(name, documentation)
+        self.type = kind
+        self._read = read
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name} {self._read()}"]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, entry in self._values.items():
+            for bound, count in zip(self.buckets, entry):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {entry[-2]}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_count{labels} {entry[-2]}")
+            lines.append(f"{self.name}_sum{labels} {entry[-1]}")
+        return lines
+
+
+DISPATCH_SECONDS = Histogram(
+    "bot_dispatch_seconds", "Time to route and handle an update",
+    ["update", "handled"],
+)
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Time spent in update handlers", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Handlers that raised an exception", ["handler"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "bot_db_query_seconds", "Execution time of DB calls on the DB thread", ["query"]
+)
+TELEGRAM_REQUESTS = Counter(
+    "bot_telegram_requests_total", "Bot API requests by method and outcome",
+    ["method", "outcome"],
+)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "bot_telegram_request_seconds", "Bot API request latency", ["method"]
+)
+DELIVERIES = Counter(
+    "bot_deliveries_total", "Sender deliveries by final outcome", ["outcome"]
+)
+JOB_SECONDS = Histogram(
+    "bot_job_seconds", "Duration of scheduled jobs", ["job"], buckets=JOB_BUCKETS
+)
+JOB_FAILURES = Counter("bot_job_failures_total", "Scheduled jobs that raised", ["job"])
+
+
+def outcome(error: BaseException = None) -> str:
+    """Short outcome label for a Bot API call result."""
+    if error is None:
+        return "ok"
+    if isinstance(error, TelegramRetryAfter):
+        return "retry_after"
+    if isinstance(error, TelegramForbiddenError):
+        return "forbidden"
+    if isinstance(error, TelegramNotFound):
+        return "not_found"
+    if isinstance(error, TelegramBadRequest):
+        return "bad_request"
+    if isinstance(error, TelegramNetworkError):
+        return "network"
+    if isinstance(error, TelegramServerError):
+        return "server"
+    return "error"
+
+
+class DispatchMetricsMiddleware(BaseMiddleware):
+    """Outer update middleware: times routing through all routers plus the handler."""
+
+    async def __call__(self, handler, event, data):
+        started = time.perf_counter()
+        handled = "error"
+        try:
+            result = await handler(event, data)
+            handled = "no" if result is UNHANDLED else "yes"
+            return result
+        finally:
+            DISPATCH_SECONDS.observe(
+                time.perf_counter() - started, update=event.event_type, handled=handled
+            )
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: times the matched handler, labelled by its function name."""
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """Bot session middleware: counts and times every Bot API request."""
+
+    async def __call__(self, make_request, bot, method):
+        name = method.__api_method__
+        started = time.perf_counter()
+        try:
+            response = await make_request(bot, method)
+        except Exception as e:
+            TELEGRAM_REQUESTS.inc(method=name, outcome=outcome(e))
+            raise
+        else:
+            TELEGRAM_REQUESTS.inc(method=name, outcome="ok")
+            return response
+        finally:
+            TELEGRAM_REQUEST_SECONDS.observe(time.perf_counter() - started, method=name)
+
+
+def track_job(func: Callable[..., Awaitable[Any]]):
+    """Wrap a scheduled coroutine function to record its duration and failures."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            JOB_FAILURES.inc(job=func.__name__)
+            raise
+        finally:
+            JOB_SECONDS.observe(time.perf_counter() - started, job=func.__name__)
+
+    return wrapper
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_server(host: str, port: int) -> web.AppRunner:
+    """Serve GET /metrics on host:port; call runner.cleanup() on shutdown."""
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
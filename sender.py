@@ -0,0 +1,247 @@
+"""
+Sender module: concurrent, rate-limited delivery of outgoing Telegram messages.
+Shared by pairing notifications, reminders and broadcasts.
+
+Failures are classified: transient ones (flood wait, network, server) are
+retried, permanent ones (bot blocked, chat not found, user deactivated)
+suppress the user in the DB so no sender addresses them again.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional
+
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+import db
+import metrics
+from config import SEND_MAX_ATTEMPTS, SEND_PER_CHAT_RATE, SEND_RATE, SEND_WORKERS
+
+
+# Bad Request descriptions meaning the chat is gone for good
+PERMANENT_BAD_REQUESTS = ("chat not found", "user not found", "peer_id_invalid")
+
+
+def is_permanent(error: Optional[BaseException]) -> bool:
+    """True if the chat will never accept messages (until the user returns)."""
+    if isinstance(error, TelegramForbiddenError):
+        # bot was blocked / kicked, user is deactivated
+        return True
+    if isinstance(error, TelegramBadRequest):
+        description = str(error).lower()
+        return any(reason in description for reason in PERMANENT_BAD_REQUESTS)
+    return False
+
+
+class TokenBucket:
+    """Token bucket refilled with `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until one token is available (0 if available right now)."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self.updated - now)
+        if self.tokens < 1:
+            wait += (1 - self.tokens) / self.rate
+        return wait
+
+    def reserve(self) -> float:
+        """Take one token (possibly on credit) and return how long to wait for it."""
+        wait = self.delay()
+        self.tokens -= 1
+        return wait
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold the bucket empty for `seconds` (used for Telegram flood waits)."""
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        return self.delay() == 0 and self.tokens >= self.capacity
+
+
+@dataclass
+class Delivery:
+    """One API call addressed to a single chat: `call(chat_id)` performs it."""
+
+    chat_id: int
+    call: Callable[[int], Awaitable[Any]]
+    key: Optional[Hashable] = None
+    attempts: int = 0
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: int
+    ok: bool
+    response: Any = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+
+
+def message(bot, chat_id: int, text: str, **kwargs) -> Delivery:
+    """Delivery for bot.send_message(chat_id, text, **kwargs)."""
+    return Delivery(chat_id, functools.partial(bot.send_message, text=text, **kwargs))
+
+
+def copy(bot, chat_id: int, from_chat_id: int, message_id: int, **kwargs) -> Delivery:
+    """Delivery for bot.copy_message(chat_id, from_chat_id, message_id, **kwargs)."""
+    return Delivery(
+        chat_id,
+        functools.partial(
+            bot.copy_message, from_chat_id=from_chat_id, message_id=message_id, **kwargs
+        ),
+    )
+
+
+class Sender:
+    """
+    Runs deliveries through a bounded pool of workers.
+    A global token bucket keeps the bot under Telegram's overall limit and
+    per-chat buckets keep each chat under its own limit. A chat that is not
+    ready yet (or got RetryAfter) is put back on the queue with a timer, so
+    workers keep serving other chats in the meantime.
+    """
+
+    # Prune idle per-chat buckets once the table grows beyond this size
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(
+        self,
+        rate: float = SEND_RATE,
+        per_chat_rate: float = SEND_PER_CHAT_RATE,
+        workers: int = SEND_WORKERS,
+        max_attempts: int = SEND_MAX_ATTEMPTS,
+    ):
+        self.per_chat_rate = per_chat_rate
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._global = TokenBucket(rate)
+        self._chats: Dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.MAX_CHAT_BUCKETS:
+                for idle in [k for k, b in self._chats.items() if b.is_idle()]:
+                    del self._chats[idle]
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate)
+        return bucket
+
+    async def deliver(
+        self, deliveries: Iterable[Delivery]
+    ) -> Dict[Hashable, DeliveryResult]:
+        """
+        Perform all deliveries concurrently and wait for every one to finish.
+        Returns {delivery.key or chat_id: DeliveryResult}.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for delivery in deliveries:
+            queue.put_nowait(delivery)
+
+        results: Dict[Hashable, DeliveryResult] = {}
+        permanent: Dict[int, str] = {}
+        pending = queue.qsize()
+        if not pending:
+            return results
+
+        finished = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def requeue(delivery: Delivery, delay: float):
+            loop.call_later(delay, queue.put_nowait, delivery)
+
+        def resolve(delivery: Delivery, ok: bool, response=None, error=None):
+            nonlocal pending
+            key = delivery.key if delivery.key is not None else delivery.chat_id
+            results[key] = DeliveryResult(
+                delivery.chat_id, ok, response, error, delivery.attempts
+            )
+            metrics.DELIVERIES.inc(outcome=metrics.outcome(error))
+            if is_permanent(error):
+                permanent[delivery.chat_id] = str(error)
+            elif error is not None:
+                logging.error(f"Delivery to {delivery.chat_id} failed: {error}")
+            pending -= 1
+            if not pending:
+                finished.set()
+
+        async def worker():
+            while True:
+                delivery = await queue.get()
+                bucket = self._chat_bucket(delivery.chat_id)
+                wait = bucket.delay()
+                if wait > 0:
+                    requeue(delivery, wait)
+                    continue
+                bucket.reserve()
+                await self._global.acquire()
+
+                delivery.attempts += 1
+                retry = delivery.attempts < self.max_attempts
+                try:
+                    response = await delivery.call(delivery.chat_id)
+                except TelegramRetryAfter as e:
+                    bucket.pause(e.retry_after)
+                    if retry:
+                        requeue(delivery, e.retry_after)
+                    else:
+                        resolve(delivery, False, error=e)
+                except (TelegramNetworkError, TelegramServerError) as e:
+                    if retry:
+                        requeue(delivery, 2**delivery.attempts)
+                    else:
+                        resolve(delivery, False, error=e)
+                except Exception as e:
+                    resolve(delivery, False, error=e)
+                else:
+                    resolve(delivery, True, response)
+
+        workers = [
+            asyncio.create_task(worker()) for _ in range(min(self.workers, pending))
+        ]
+        try:
+            await finished.wait()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        if permanent:
+            suppressed = await db.suppress_users(permanent)
+            logging.info(
+                f"Suppressed {suppressed} of {len(permanent)} unreachable chats "
+                "(blocked the bot or no longer exist)"
+            )
+        return results
+
+
+# Shared engine: one global rate limit for every sender in the process
+sender = Sender()
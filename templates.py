@@ -0,0 +1,636 @@
+"""
+Templates module: user-facing texts and keyboards, compiled once at import.
+
+Each message is parsed into its static parts and slot names up front, so
+rendering for a recipient is a single join of the parts with the (HTML
+escaped) slot values. Static keyboards are built once and shared by all
+recipients. Texts are grouped by locale; LOCALE from config is the default
+and missing keys fall back to Russian.
+"""
+
+import html
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from config import LOCALE
+
+DEFAULT_LOCALE = "ru"
+# Частоты участия (в неделях), которые пользователь выбирает сам
+FREQUENCY_CHOICES = (1, 2, 4)
+
+
+class Template:
+    """
+    A message with `{slot}` placeholders. Slot values are HTML-escaped;
+    `{slot!s}` inserts an already rendered fragment as is.
+    """
+
+    __slots__ = ("literals", "fields", "raw")
+
+    def __init__(self, source: str):
+        self.literals: List[str] = [""]
+        self.fields: List[str] = []
+        self.raw: List[bool] = []
+        for literal, field, _, conversion in Formatter().parse(source):
+            self.literals[-1] += literal
+            if field is not None:
+                self.fields.append(field)
+                self.raw.append(conversion == "s")
+                self.literals.append("")
+
+    def render(self, **values) -> str:
+        if not self.fields:
+            return self.literals[0]
+        chunks = [self.literals[0]]
+        for field, raw, literal in zip(self.fields, self.raw, self.literals[1:]):
+            value = values[field]
+            chunks.append(str(value) if raw else html.escape(str(value), quote=False))
+            chunks.append(literal)
+        return "".join(chunks)
+
+
+_SOURCES: Dict[str, Dict[str, str]] = {
+    "ru": {
+        "unknown": "Неизвестно",
+        "not_specified": "не указан",
+        "no_username": "нет username",
+        # Уведомления о паре
+        "partner": (
+            "☕ <b>Новый партнер для Random Coffee!</b>\n\n"
+            "👤 <b>Имя:</b> {name}\n"
+            "💼 <b>Должность:</b> {position}\n"
+            "🏢 <b>Отдел:</b> {department}\n"
+            "{contact!s}\n"
+            "Теперь ты можешь написать своему партнеру и договориться о встрече на этой неделе."
+        ),
+        "partner_contact": "📱 <b>Контакты:</b> @{username}\n",
+        "partner_no_contact": "📱 (нет username)\n",
+        "group": (
+            "☕ <b>Random Coffee: на этой неделе встреча втроём!</b>\n\n"
+            "{members!s}\n\n"
+            "Создайте общий чат или напишите друг другу и договоритесь о встрече на этой неделе."
+        ),
+        "group_member": "👤 <b>{name}</b> — {position}, {department} ({contact})",
+        "no_pair": (
+            "☕ <b>Random Coffee</b>\n\n"
+            "В этом раунде не нашлось для вас пары, потому что количество участников оказалось нечетным.\n"
+            "В следующий раз обязательно найдём вам собеседника!"
+        ),
+        # Напоминания
+        "reminder_after_pairing": (
+            "👋 Привет!\n"
+            "Напоминаем, что ты участвуешь в Random Coffee на этой неделе ☕\n\n"
+            "Уже договорился(ась) {whom!s}? Если ещё нет — напиши, это займёт меньше минуты :)\n\n"
+            "Цель — просто пообщаться. Узнать лучше своего коллегу: чем он занимается, что делает на работе, чем увлекается в свободное время.\n\n"
+            "Удачной встречи!"
+        ),
+        "reminder_one_partner": "со своим напарником {name}",
+        "reminder_two_partners": "со своими напарниками {first} и {second}",
+        "weekly_reminder": (
+            "👋 Привет!\n"
+            "Напоминаем, что ты участвуешь в Random Coffee на этой неделе ☕\n\n"
+            "Если ещё не договорился(ась) о встрече — напиши своему напарнику, это займёт меньше минуты :)\n\n"
+            "Цель — просто пообщаться. Узнать лучше своего коллегу: чем он занимается, что делает на работе, чем увлекается в свободное время.\n\n"
+            "Удачной встречи!"
+        ),
+        # Приветствие и справка
+        "welcome": (
+            "Привет! 👋 Добро пожаловать в Random Coffee!\n"
+            "Это корпоративный формат, в котором сотрудники из разных команд встречаются случайным образом — чтобы просто пообщаться, познакомиться, поделиться опытом или обсудить что угодно.\n"
+            "Мы формируем пары, и вы вместе идёте на кофе, обед или встречу после работы — выбор места по желанию.\n"
+            "🎯 Цель — налаживать связи внутри компании, узнавать новое и напоминать друг другу: мы — не только роли и функции, мы — команда.\n\n"
+            "📝 Как это работает:\n\n"
+            "1. Все желающие регистрируются и выбирают частоту участия в жеребьевке (раз в неделю или раз в месяц)\n"
+            "2. Назначается дата жеребьёвки\n"
+            "3. В назначенную дату тебе приходит имя партнера и как с ним можно связаться\n"
+            "4. Вы договариваетесь о встрече на этой неделе\n"
+            "5. Пьёте кофе, обсуждаете интересные темы.\n\n"
+            "🤝 Надеемся, это будет полезно и приятно.\n"
+            "Хорошей беседы и вкусного кофе ☕\n\n"
+            "Нажми кнопку ниже, чтобы присоединиться:"
+        ),
+        "cohort_joined": "🏢 Вы участвуете в жеребьевке группы «{name}».",
+        "welcome_back": (
+            "С возвращением! Вы уже зарегистрированы в Random Coffee.\n"
+            "Используйте /profile для просмотра или изменения данных."
+        ),
+        "help": (
+            "<b>Доступные команды:</b>\n\n"
+            "/start - Начать работу с ботом\n"
+            "/profile - Просмотреть/изменить профиль\n"
+            "/help - Показать эту справку\n\n"
+            "<b>О сервисе:</b>\n"
+            "Random Coffee - это возможность познакомиться с коллегами в неформальной обстановке.\n\n"
+            "По всем вопросам обращайтесь к администратору."
+        ),
+        "registration_complete": (
+            "🎉 <b>Регистрация завершена!</b>\n\n"
+            "Теперь вы участник Random Coffee!\n\n"
+            "Вы будете получать нового собеседника {frequency}. "
+            "Первое знакомство — в ближайшую жеребьевку."
+        ),
+        "profile": (
+            "<b>👤 Ваш профиль:</b>\n\n"
+            "👤 <b>Имя:</b>  {first_name} {last_name}\n"
+            "💼 <b>Должность:</b> {position}\n"
+            "🏢 <b>Отдел:</b> {department}\n"
+            "🔁 <b>Встречи:</b> {frequency}\n"
+            "Статус: {status}\n\n"
+            "Используйте кнопки ниже для управления профилем:"
+        ),
+        "status_active": "Активный ✅",
+        "status_inactive": "Неактивный ❌",
+        # Частота участия (в неделях)
+        "frequency_1": "каждую неделю",
+        "frequency_2": "раз в две недели",
+        "frequency_4": "раз в месяц",
+        "frequency_n": "раз в {weeks} недель",
+        "frequency_prompt": "🔁 <b>Как часто вы хотите встречаться?</b>",
+        "frequency_saved": "✅ Теперь встречи {frequency}.",
+        # Кнопки
+        "btn_write_partner": "✉️ Написать напарнику",
+        "btn_write_named": "✉️ Написать: {name}",
+        "btn_agreed": "✅ Договорились",
+        "btn_start_registration": "🔄 Начать регистрацию",
+        "btn_help": "ℹ️ Помощь",
+        "btn_profile": "👤 Профиль",
+        "btn_leave": "🚪 Выйти из бота",
+        "btn_frequency": "🔁 Частота встреч",
+        "btn_back": "⬅️ Назад",
+        "btn_cancel": "❌ Отменить",
+        "btn_reactivate": "🔄 Вернуться",
+        "btn_confirm_registration": "✅ Да, сохранить",
+        "btn_restart_registration": "❌ Нет, начать заново",
+        "btn_update_profile": "✏️ Обновить данные",
+        "btn_unsubscribe": "❌ Отписаться",
+        "btn_continue": "☕ Продолжить участие",
+        "btn_decline": "❌ Отказаться от участия",
+        "btn_open_chat": "✉️ Открыть чат",
+        "btn_open_chat_named": "✉️ Открыть чат: {name}",
+        # Регистрация
+        "registration_first_name": (
+            "📝 Давайте начнем регистрацию. Это займет меньше минуты!\n\n"
+            "<b>Пожалуйста, введите ваше имя:</b>"
+        ),
+        "registration_last_name": "👌 Отлично, {name}! Теперь <b>введите вашу фамилию:</b>",
+        "registration_position": (
+            "💼 <b>Укажите вашу должность:</b>\n\n"
+            "Примеры:\n"
+            "• Менеджер проектов\n"
+            "• Разработчик Python\n"
+            "• Дизайнер интерфейсов"
+        ),
+        "registration_department": (
+            "🏢 <b>Укажите ваш отдел или направление:</b>\n\n"
+            "Примеры:\n"
+            "• Разработка\n"
+            "• Маркетинг\n"
+            "• Финансы\n"
+            "• HR"
+        ),
+        "first_name_too_short": "❌ Имя слишком короткое. Пожалуйста, введите ваше настоящее имя.",
+        "last_name_too_short": "❌ Фамилия слишком короткая. Пожалуйста, введите вашу настоящую фамилию.",
+        "position_too_short": "❌ Должность слишком короткая. Пожалуйста, укажите корректно.",
+        "department_too_short": "❌ Название отдела слишком короткое. Пожалуйста, укажите корректно.",
+        "registration_confirm": (
+            "<b>Проверьте ваши данные:</b>\n\n"
+            "👤 <b>Имя:</b> {first_name} {last_name}\n"
+            "💼 <b>Должность:</b> {position}\n"
+            "🏢 <b>Отдел:</b> {department}\n"
+            "🔁 <b>Встречи:</b> {frequency}\n\n"
+            "Всё верно?"
+        ),
+        "profile_updated": (
+            "🔄 <b>Данные обновлены!</b>\n\n"
+            "Ваша информация в системе Random Coffee была успешно обновлена."
+        ),
+        # Подписка
+        "access_denied": "⛔ Доступ запрещен",
+        "not_registered": (
+            "❌ Вы не зарегистрированы в системе или были удалены.\n"
+            "Используйте /start для регистрации."
+        ),
+        "not_registered_yet": (
+            "❌ Вы еще не зарегистрированы в системе!\n"
+            "Используйте /start для регистрации."
+        ),
+        "unsubscribed": (
+            "<b>👋 Вы отписались от Random Coffee</b>\n\n"
+            "Жаль, что вы уходите! Если захотите вернуться, "
+            "используйте команду /start"
+        ),
+        "unsubscribed_before": (
+            "👋 Вы ранее отписались от Random Coffee.\n"
+            "Нажмите кнопку ниже, чтобы снова участвовать."
+        ),
+        "reactivated": (
+            "<b>🎉 Вы снова участвуете в Random Coffee!</b>\n\n"
+            "На следующей неделе вы получите нового собеседника.\n\n"
+            "Используйте /profile для проверки и обновления данных."
+        ),
+        "action_cancelled": "❌ Действие отменено. Используйте /start когда будете готовы.",
+        # После встречи
+        "meeting_agreed": (
+            "🎉 Отлично, встреча назначена!\n\n"
+            "Хотите продолжить участие в Random Coffee на следующей неделе?"
+        ),
+        "participation_continued": (
+            "✅ Вы продолжите участие в Random Coffee! Новая пара будет в следующий понедельник."
+        ),
+        "no_partner_username": "Партнёр ещё не назначен или у него нет username.",
+        "no_name": "Без имени",
+        "partner_with_contact": "{name} (@{username})",
+        "current_partner": "Ваш напарник на этой неделе: {names!s}",
+        "current_partners": "Ваши напарники на этой неделе: {names!s}",
+    },
+    "en": {
+        "unknown": "Unknown",
+        "not_specified": "not specified",
+        "no_username": "no username",
+        "partner": (
+            "☕ <b>Your new Random Coffee partner!</b>\n\n"
+            "👤 <b>Name:</b> {name}\n"
+            "💼 <b>Position:</b> {position}\n"
+            "🏢 <b>Department:</b> {department}\n"
+            "{contact!s}\n"
+            "Message your partner and agree on a meeting this week."
+        ),
+        "partner_contact": "📱 <b>Contact:</b> @{username}\n",
+        "partner_no_contact": "📱 (no username)\n",
+        "group": (
+            "☕ <b>Random Coffee: a meeting of three this week!</b>\n\n"
+            "{members!s}\n\n"
+            "Start a group chat or message each other and agree on a meeting this week."
+        ),
+        "group_member": "👤 <b>{name}</b> — {position}, {department} ({contact})",
+        "no_pair": (
+            "☕ <b>Random Coffee</b>\n\n"
+            "There was no partner for you this round because the number of participants was odd.\n"
+            "We will definitely find you someone next time!"
+        ),
+        "reminder_after_pairing": (
+            "👋 Hi!\n"
+            "A reminder that you are taking part in Random Coffee this week ☕\n\n"
+            "Have you agreed {whom!s} yet? If not, send a message, it takes less than a minute :)\n\n"
+            "The goal is simply to talk and get to know your colleague better.\n\n"
+            "Enjoy the meeting!"
+        ),
+        "reminder_one_partner": "on a meeting with {name}",
+        "reminder_two_partners": "on a meeting with {first} and {second}",
+        "weekly_reminder": (
+            "👋 Hi!\n"
+            "A reminder that you are taking part in Random Coffee this week ☕\n\n"
+            "If you have not agreed on a meeting yet, message your partner, it takes less than a minute :)\n\n"
+            "The goal is simply to talk and get to know your colleague better.\n\n"
+            "Enjoy the meeting!"
+        ),
+        "welcome": (
+            "Hi! 👋 Welcome to Random Coffee!\n"
+            "Colleagues from different teams meet at random to talk, get acquainted and share experience.\n\n"
+            "📝 How it works:\n\n"
+            "1. Register and choose how often you want to take part\n"
+            "2. On the pairing day you get your partner's name and contact\n"
+            "3. You agree on a meeting this week\n"
+            "4. Have a coffee and a good conversation ☕\n\n"
+            "Press the button below to join:"
+        ),
+        "cohort_joined": "🏢 You are now in the «{name}» group draw.",
+        "welcome_back": (
+            "Welcome back! You are already registered in Random Coffee.\n"
+            "Use /profile to view or change your details."
+        ),
+        "help": (
+            "<b>Commands:</b>\n\n"
+            "/start - Start using the bot\n"
+            "/profile - View/change your profile\n"
+            "/help - Show this help\n\n"
+            "<b>About:</b>\n"
+            "Random Coffee is a way to get to know colleagues in an informal setting.\n\n"
+            "Contact the administrator with any questions."
+        ),
+        "registration_complete": (
+            "🎉 <b>Registration complete!</b>\n\n"
+            "You are now a Random Coffee participant!\n\n"
+            "You will get a new partner {frequency}. "
+            "The first one comes with the next draw."
+        ),
+        "profile": (
+            "<b>👤 Your profile:</b>\n\n"
+            "👤 <b>Name:</b>  {first_name} {last_name}\n"
+            "💼 <b>Position:</b> {position}\n"
+            "🏢 <b>Department:</b> {department}\n"
+            "🔁 <b>Meetings:</b> {frequency}\n"
+            "Status: {status}\n\n"
+            "Use the buttons below to manage your profile:"
+        ),
+        "status_active": "Active ✅",
+        "status_inactive": "Inactive ❌",
+        "frequency_1": "every week",
+        "frequency_2": "every two weeks",
+        "frequency_4": "once a month",
+        "frequency_n": "every {weeks} weeks",
+        "frequency_prompt": "🔁 <b>How often would you like to meet?</b>",
+        "frequency_saved": "✅ Meetings are now {frequency}.",
+        "btn_write_partner": "✉️ Message partner",
+        "btn_write_named": "✉️ Message {name}",
+        "btn_agreed": "✅ Agreed",
+        "btn_start_registration": "🔄 Register",
+        "btn_help": "ℹ️ Help",
+        "btn_profile": "👤 Profile",
+        "btn_leave": "🚪 Leave",
+        "btn_frequency": "🔁 Meeting frequency",
+        "btn_back": "⬅️ Back",
+        "btn_cancel": "❌ Cancel",
+        "btn_reactivate": "🔄 Come back",
+        "btn_confirm_registration": "✅ Yes, save",
+        "btn_restart_registration": "❌ No, start over",
+        "btn_update_profile": "✏️ Update details",
+        "btn_unsubscribe": "❌ Unsubscribe",
+        "btn_continue": "☕ Keep participating",
+        "btn_decline": "❌ Stop participating",
+        "btn_open_chat": "✉️ Open chat",
+        "btn_open_chat_named": "✉️ Open chat: {name}",
+        "registration_first_name": (
+            "📝 Let's get you registered. It takes less than a minute!\n\n"
+            "<b>Please enter your first name:</b>"
+        ),
+        "registration_last_name": "👌 Great, {name}! Now <b>enter your last name:</b>",
+        "registration_position": (
+            "💼 <b>Enter your position:</b>\n\n"
+            "Examples:\n"
+            "• Project manager\n"
+            "• Python developer\n"
+            "• UI designer"
+        ),
+        "registration_department": (
+            "🏢 <b>Enter your department or area:</b>\n\n"
+            "Examples:\n"
+            "• Engineering\n"
+            "• Marketing\n"
+            "• Finance\n"
+            "• HR"
+        ),
+        "first_name_too_short": "❌ The first name is too short. Please enter your real first name.",
+        "last_name_too_short": "❌ The last name is too short. Please enter your real last name.",
+        "position_too_short": "❌ The position is too short. Please enter it correctly.",
+        "department_too_short": "❌ The department name is too short. Please enter it correctly.",
+        "registration_confirm": (
+            "<b>Check your details:</b>\n\n"
+            "👤 <b>Name:</b> {first_name} {last_name}\n"
+            "💼 <b>Position:</b> {position}\n"
+            "🏢 <b>Department:</b> {department}\n"
+            "🔁 <b>Meetings:</b> {frequency}\n\n"
+            "Is everything correct?"
+        ),
+        "profile_updated": (
+            "🔄 <b>Details updated!</b>\n\n"
+            "Your Random Coffee details have been updated."
+        ),
+        "access_denied": "⛔ Access denied",
+        "not_registered": (
+            "❌ You are not registered or have been removed.\n"
+            "Use /start to register."
+        ),
+        "not_registered_yet": (
+            "❌ You are not registered yet!\n"
+            "Use /start to register."
+        ),
+        "unsubscribed": (
+            "<b>👋 You have unsubscribed from Random Coffee</b>\n\n"
+            "Sorry to see you go! If you want to come back, use /start"
+        ),
+        "unsubscribed_before": (
+            "👋 You unsubscribed from Random Coffee earlier.\n"
+            "Press the button below to take part again."
+        ),
+        "reactivated": (
+            "<b>🎉 You are back in Random Coffee!</b>\n\n"
+            "You will get a new partner next week.\n\n"
+            "Use /profile to check and update your details."
+        ),
+        "action_cancelled": "❌ Cancelled. Use /start when you are ready.",
+        "meeting_agreed": (
+            "🎉 Great, the meeting is set!\n\n"
+            "Would you like to keep taking part in Random Coffee next week?"
+        ),
+        "participation_continued": (
+            "✅ You will keep taking part in Random Coffee! Your next partner comes next Monday."
+        ),
+        "no_partner_username": "No partner yet, or your partner has no username.",
+        "no_name": "No name",
+        "partner_with_contact": "{name} (@{username})",
+        "current_partner": "Your partner this week: {names!s}",
+        "current_partners": "Your partners this week: {names!s}",
+    },
+}
+
+# Compiled once: {locale: {name: Template}}
+_TEMPLATES: Dict[str, Dict[str, Template]] = {
+    locale: {name: Template(source) for name, source in sources.items()}
+    for locale, sources in _SOURCES.items()
+}
+
+
+def get(name: str, locale: str = LOCALE) -> Template:
+    templates = _TEMPLATES.get(locale, _TEMPLATES[DEFAULT_LOCALE])
+    template = templates.get(name)
+    if template is None:
+        template = _TEMPLATES[DEFAULT_LOCALE][name]
+    return template
+
+
+def render(name: str, locale: str = LOCALE, /, **values) -> str:
+    # name и locale только позиционные: в шаблонах есть слот {name}
+    return get(name, locale).render(**values)
+
+
+# --- Сообщения с логикой поверх шаблонов ---
+
+
+def _profile_fields(row: tuple, locale: str) -> dict:
+    """Slots of a participant row (user_id, username, full_name, position, department, ...)."""
+    missing = render("not_specified", locale)
+    return {
+        "name": row[2] if len(row) > 2 else render("unknown", locale),
+        "position": row[3] if len(row) > 3 and row[3] else missing,
+        "department": row[4] if len(row) > 4 and row[4] else missing,
+    }
+
+
+def partner_message(partner: tuple, locale: str = LOCALE) -> str:
+    if partner[1]:
+        contact = render("partner_contact", locale, username=partner[1])
+    else:
+        contact = render("partner_no_contact", locale)
+    return render("partner", locale, contact=contact, **_profile_fields(partner, locale))
+
+
+def group_message(partners: list, locale: str = LOCALE) -> str:
+    member = get("group_member", locale)
+    members = "\n".join(
+        member.render(
+            contact=f"@{partner[1]}" if partner[1] else render("no_username", locale),
+            **_profile_fields(partner, locale),
+        )
+        for partner in partners
+    )
+    return render("group", locale, members=members)
+
+
+def reminder_after_pairing(partners: list, locale: str = LOCALE) -> str:
+    """partners — [{"full_name", "username"}, ...]."""
+    names = [p.get("full_name") or render("unknown", locale) for p in partners]
+    if len(names) > 1:
+        whom = render("reminder_two_partners", locale, first=names[0], second=names[1])
+    else:
+        whom = render(
+            "reminder_one_partner", locale, name=names[0] if names else render("unknown", locale)
+        )
+    return render("reminder_after_pairing", locale, whom=whom)
+
+
+def frequency_label(weeks: int, locale: str = LOCALE) -> str:
+    if weeks in FREQUENCY_CHOICES:
+        return render(f"frequency_{weeks}", locale)
+    return render("frequency_n", locale, weeks=weeks)
+
+
+# --- Клавиатуры: статичные строятся один раз и переиспользуются ---
+
+
+@lru_cache(maxsize=None)
+def agreed_row(locale: str = LOCALE) -> tuple:
+    return (InlineKeyboardButton(text=render("btn_agreed", locale), callback_data="paired_confirmed"),)
+
+
+@lru_cache(maxsize=None)
+def agreed_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[list(agreed_row(locale))])
+
+
+def partner_keyboard(partners: list, locale: str = LOCALE) -> InlineKeyboardMarkup:
+    """«Написать напарнику» for partners with a username plus «Договорились»."""
+    rows = []
+    for partner in partners:
+        username = (partner.get("username") or "").lstrip("@")
+        if not username:
+            continue
+        if len(partners) > 1:
+            text = render("btn_write_named", locale, name=partner.get("full_name") or username)
+        else:
+            text = render("btn_write_partner", locale)
+        rows.append([InlineKeyboardButton(text=text, url=f"https://t.me/{username}")])
+    if not rows:
+        return agreed_keyboard(locale)
+    rows.append(list(agreed_row(locale)))
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@lru_cache(maxsize=None)
+def start_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=render("btn_start_registration", locale),
+                    callback_data="start_registration",
+                ),
+                InlineKeyboardButton(text=render("btn_help", locale), callback_data="help_info"),
+            ]
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def registration_complete_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(text=render("btn_help", locale), callback_data="help_info"),
+                InlineKeyboardButton(text=render("btn_profile", locale), callback_data="profile_info"),
+            ],
+            [
+                InlineKeyboardButton(
+                    text=render("btn_leave", locale), callback_data="confirm_unsubscribe"
+                )
+            ],
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def frequency_keyboard(
+    action: str, back: str = None, locale: str = LOCALE
+) -> InlineKeyboardMarkup:
+    """Выбор частоты: кнопки `<action>:<weeks>` и, если задано, «Назад» на `back`."""
+    rows = [
+        [
+            InlineKeyboardButton(
+                text=frequency_label(weeks, locale).capitalize(),
+                callback_data=f"{action}:{weeks}",
+            )
+        ]
+        for weeks in FREQUENCY_CHOICES
+    ]
+    if back:
+        rows.append([InlineKeyboardButton(text=render("btn_back", locale), callback_data=back)])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def _button_rows(*rows) -> InlineKeyboardMarkup:
+    """Клавиатура из строк кнопок вида (text, callback_data)."""
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text=text, callback_data=data) for text, data in row]
+            for row in rows
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def back_keyboard(back: str, locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return _button_rows([(render("btn_back", locale), back)])
+
+
+@lru_cache(maxsize=None)
+def cancel_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return _button_rows([(render("btn_cancel", locale), "cancel_action")])
+
+
+@lru_cache(maxsize=None)
+def reactivate_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return _button_rows([(render("btn_reactivate", locale), "reactivate_user")])
+
+
+@lru_cache(maxsize=None)
+def confirm_registration_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return _button_rows(
+        [
+            (render("btn_confirm_registration", locale), "confirm_registration"),
+            (render("btn_restart_registration", locale), "start_registration"),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def profile_keyboard(back: bool = False, locale: str = LOCALE) -> InlineKeyboardMarkup:
+    """Управление профилем; `back` — кнопка «Назад» к экрану после регистрации."""
+    rows = [
+        [(render("btn_update_profile", locale), "start_registration")],
+        [(render("btn_frequency", locale), "profile_frequency")],
+        [(render("btn_unsubscribe", locale), "confirm_unsubscribe")],
+    ]
+    if back:
+        rows.append([(render("btn_back", locale), "after_registration")])
+    return _button_rows(*rows)
+
+
+@lru_cache(maxsize=None)
+def continue_keyboard(locale: str = LOCALE) -> InlineKeyboardMarkup:
+    return _button_rows(
+        [(render("btn_continue", locale), "continue_participation")],
+        [(render("btn_decline", locale), "confirm_unsubscribe")],
+    )
@@ -1,5 +1,5 @@
 from aiogram import Router, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import (
     Message,
     InlineKeyboardMarkup,
@@ -8,26 +8,28 @@ from aiogram.types import (
 )
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from aiogram.utils.markdown import hbold, hitalic
 import logging
 import db
+import sender
+import templates
 
+# Сколько напоминаний отправлять за одну порцию
+REMINDER_BATCH_SIZE = 500
 
-user_router = Router()
+
+user_router = Router(name="user")
 
 
 # /help command handler
 @user_router.message(Command("help"))
 async def cmd_help(message: Message):
-    await message.answer(
-        f"{hbold('Доступные команды:')}\n\n"
-        "/start - Начать работу с ботом\n"
-        "/profile - Просмотреть/изменить профиль\n"
-        "/help - Показать эту справку\n\n"
-        f"{hbold('О сервисе:')}\n"
-        "Random Coffee - это возможность познакомиться с коллегами в неформальной обстановке.\n\n"
-        "По всем вопросам обращайтесь к администратору."
-    )
+    await message.answer(templates.render("help"))
+
+
+# Админы получают /admin раньше, в admin_router; сюда доходят все остальные
+@user_router.message(Command("admin"))
+async def cmd_admin_denied(message: Message):
+    await message.answer(templates.render("access_denied"))
 
 
 class RegistrationStates(StatesGroup):
@@ -35,88 +37,51 @@ class RegistrationStates(StatesGroup):
     last_name = State()
     position = State()
     department = State()
-
-
-def get_start_kb():
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="🔄 Начать регистрацию", callback_data="start_registration"
-                ),
-                InlineKeyboardButton(text="ℹ️ Помощь", callback_data="help_info"),
-            ]
-        ]
-    )
-
-
-def get_cancel_kb():
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_action")]
-        ]
-    )
+    frequency = State()
 
 
 @user_router.message(Command("start"))
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, command: CommandObject):
     await state.clear()
     user_id = message.from_user.id
-    existing_user = db.get_user(user_id)
+    existing_user = await db.get_user(user_id)
+
+    # Ссылка t.me/<bot>?start=<когорта> записывает в когорту (офис, чат)
+    cohort = await db.get_cohort(name=command.args.strip()) if command.args else None
+
+    if existing_user and cohort and await db.set_user_cohort(user_id, cohort["id"]):
+        await message.answer(templates.render("cohort_joined", name=cohort["name"]))
 
     if existing_user:
         if existing_user[9]:  # is_active
-            text = (
-                f"С возвращением! Вы уже зарегистрированы в Random Coffee.\n"
-                f"Используйте /profile для просмотра или изменения данных."
-            )
-            await message.answer(text)
+            await message.answer(templates.render("welcome_back"))
             return
         else:
-            reactivate_kb = InlineKeyboardMarkup(
-                inline_keyboard=[
-                    [
-                        InlineKeyboardButton(
-                            text="🔄 Вернуться", callback_data="reactivate_user"
-                        )
-                    ]
-                ]
-            )
             await message.answer(
-                "👋 Вы ранее отписались от Random Coffee.\n"
-                "Нажмите кнопку ниже, чтобы снова участвовать.",
-                reply_markup=reactivate_kb,
+                templates.render("unsubscribed_before"),
+                reply_markup=templates.reactivate_keyboard(),
             )
             return
 
-    text = (
-        "Привет! 👋 Добро пожаловать в Random Coffee!\n"
-        "Это корпоративный формат, в котором сотрудники из разных команд встречаются случайным образом — чтобы просто пообщаться, познакомиться, поделиться опытом или обсудить что угодно.\n"
-        "Мы формируем пары, и вы вместе идёте на кофе, обед или встречу после работы — выбор места по желанию.\n"
-        "🎯 Цель — налаживать связи внутри компании, узнавать новое и напоминать друг другу: мы — не только роли и функции, мы — команда.\n\n"
-        "📝 Как это работает:\n\n"
-        "1. Все желающие регистрируются и выбирают частоту участия в жеребьевке (раз в неделю или раз в месяц)\n"
-        "2. Назначается дата жеребьёвки\n"
-        "3. В назначенную дату тебе приходит имя партнера и как с ним можно связаться\n"
-        "4. Вы договариваетесь о встрече на этой неделе\n"
-        "5. Пьёте кофе, обсуждаете интересные темы.\n\n"
-        "🤝 Надеемся, это будет полезно и приятно.\n"
-        "Хорошей беседы и вкусного кофе ☕\n\n"
-        "Нажми кнопку ниже, чтобы присоединиться:"
-    )
-    await message.answer(text, reply_markup=get_start_kb())
+    if cohort:
+        await state.update_data(cohort_id=cohort["id"])
+    text = templates.render("welcome")
+    await message.answer(text, reply_markup=templates.start_keyboard())
 
 
 @user_router.callback_query(F.data == "start_registration")
 async def on_start_registration(call: CallbackQuery, state: FSMContext):
     user_id = call.from_user.id
-    existing_user = db.get_user(user_id)
+    existing_user = await db.get_user(user_id)
+    # Когорта из ссылки /start переживает сброс состояния
+    cohort_id = (await state.get_data()).get("cohort_id")
     await state.clear()
-    text = (
-        "📝 Давайте начнем регистрацию. Это займет меньше минуты!\n\n"
-        f"{hbold('Пожалуйста, введите ваше имя:')}"
+    if cohort_id:
+        await state.update_data(cohort_id=cohort_id)
+    await call.message.answer(
+        templates.render("registration_first_name"),
+        reply_markup=templates.cancel_keyboard(),
     )
-    await call.message.answer(text, reply_markup=get_cancel_kb())
     await state.set_state(RegistrationStates.first_name)
     await call.answer()
 
@@ -125,15 +90,13 @@ async def on_start_registration(call: CallbackQuery, state: FSMContext):
 async def process_first_name(message: Message, state: FSMContext):
     name = message.text.strip()
     if len(name) < 2:
-        await message.answer(
-            "❌ Имя слишком короткое. Пожалуйста, введите ваше настоящее имя."
-        )
+        await message.answer(templates.render("first_name_too_short"))
         return
 
     await state.update_data(first_name=name)
     await message.answer(
-        f"👌 Отлично, {name}! Теперь {hbold('введите вашу фамилию:')}",
-        reply_markup=get_cancel_kb(),
+        templates.render("registration_last_name", name=name),
+        reply_markup=templates.cancel_keyboard(),
     )
     await state.set_state(RegistrationStates.last_name)
 
@@ -142,19 +105,13 @@ async def process_first_name(message: Message, state: FSMContext):
 async def process_last_name(message: Message, state: FSMContext):
     last_name = message.text.strip()
     if len(last_name) < 2:
-        await message.answer(
-            "❌ Фамилия слишком короткая. Пожалуйста, введите вашу настоящую фамилию."
-        )
+        await message.answer(templates.render("last_name_too_short"))
         return
 
     await state.update_data(last_name=last_name)
     await message.answer(
-        f"💼 {hbold('Укажите вашу должность:')}\n\n"
-        "Примеры:\n"
-        "• Менеджер проектов\n"
-        "• Разработчик Python\n"
-        "• Дизайнер интерфейсов",
-        reply_markup=get_cancel_kb(),
+        templates.render("registration_position"),
+        reply_markup=templates.cancel_keyboard(),
     )
     await state.set_state(RegistrationStates.position)
 
@@ -163,20 +120,13 @@ async def process_last_name(message: Message, state: FSMContext):
 async def process_position(message: Message, state: FSMContext):
     position = message.text.strip()
     if len(position) < 2:
-        await message.answer(
-            "❌ Должность слишком короткая. Пожалуйста, укажите корректно."
-        )
+        await message.answer(templates.render("position_too_short"))
         return
 
     await state.update_data(position=position)
     await message.answer(
-        f"🏢 {hbold('Укажите ваш отдел или направление:')}\n\n"
-        "Примеры:\n"
-        "• Разработка\n"
-        "• Маркетинг\n"
-        "• Финансы\n"
-        "• HR",
-        reply_markup=get_cancel_kb(),
+        templates.render("registration_department"),
+        reply_markup=templates.cancel_keyboard(),
     )
     await state.set_state(RegistrationStates.department)
 
@@ -185,39 +135,40 @@ async def process_position(message: Message, state: FSMContext):
 async def process_department(message: Message, state: FSMContext):
     department = message.text.strip()
     if len(department) < 2:
-        await message.answer(
-            "❌ Название отдела слишком короткое. Пожалуйста, укажите корректно."
-        )
+        await message.answer(templates.render("department_too_short"))
         return
 
-    data = await state.get_data()
-    first_name = data.get("first_name", "")
-    last_name = data.get("last_name", "")
-    position = data.get("position", "")
-
-    text = (
-        f"{hbold('Проверьте ваши данные:')}\n\n"
-        f"👤 {hbold('Имя:')} {first_name} {last_name}\n"
-        f"💼 {hbold('Должность:')} {position}\n"
-        f"🏢 {hbold('Отдел:')} {department}\n\n"
-        "Всё верно?"
+    await state.update_data(department=department)
+    await message.answer(
+        templates.render("frequency_prompt"),
+        reply_markup=templates.frequency_keyboard("reg_frequency", "cancel_action"),
     )
+    await state.set_state(RegistrationStates.frequency)
 
-    confirm_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="✅ Да, сохранить", callback_data="confirm_registration"
-                ),
-                InlineKeyboardButton(
-                    text="❌ Нет, начать заново", callback_data="start_registration"
-                ),
-            ]
-        ]
-    )
 
-    await state.update_data(department=department)
-    await message.answer(text, reply_markup=confirm_kb)
+@user_router.callback_query(
+    RegistrationStates.frequency, F.data.startswith("reg_frequency:")
+)
+async def process_frequency(call: CallbackQuery, state: FSMContext):
+    frequency = int(call.data.split(":")[1])
+    if frequency not in templates.FREQUENCY_CHOICES:
+        await call.answer()
+        return
+    await state.update_data(frequency=frequency)
+
+    data = await state.get_data()
+    text = templates.render(
+        "registration_confirm",
+        first_name=data.get("first_name", ""),
+        last_name=data.get("last_name", ""),
+        position=data.get("position", ""),
+        department=data.get("department", ""),
+        frequency=templates.frequency_label(frequency),
+    )
+    await call.message.edit_text(
+        text, reply_markup=templates.confirm_registration_keyboard()
+    )
+    await call.answer()
 
 
 @user_router.callback_query(F.data == "confirm_registration")
@@ -232,9 +183,9 @@ async def on_confirm_registration(call: CallbackQuery, state: FSMContext):
     position = data.get("position", "")
     department = data.get("department", "")
     full_name = f"{first_name} {last_name}"
-    frequency = 1  # по умолчанию раз в неделю
+    frequency = data.get("frequency", 1)
 
-    new_user = db.ensure_user(
+    new_user = await db.ensure_user(
         user_id=user_id,
         username=username,
         first_name=first_name,
@@ -243,91 +194,55 @@ async def on_confirm_registration(call: CallbackQuery, state: FSMContext):
         position=position,
         department=department,
         frequency=frequency,
+        cohort_id=data.get("cohort_id"),
     )
 
     if new_user:
-        text = (
-            f"🎉 {hbold('Регистрация завершена!')}\n\n"
-            "Теперь вы участник Random Coffee!\n\n"
-            "Каждую неделю вы будете получать нового собеседника. "
-            "Первое знакомство запланировано на ближайший понедельник."
+        text = templates.render(
+            "registration_complete", frequency=templates.frequency_label(frequency)
         )
     else:
-        text = (
-            f"🔄 {hbold('Данные обновлены!')}\n\n"
-            "Ваша информация в системе Random Coffee была успешно обновлена."
-        )
+        text = templates.render("profile_updated")
 
-    complete_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="ℹ️ Помощь", callback_data="help_info"),
-                InlineKeyboardButton(text="👤 Профиль", callback_data="profile_info"),
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🚪 Выйти из бота", callback_data="confirm_unsubscribe"
-                )
-            ],
-        ]
+    await call.message.edit_text(
+        text, reply_markup=templates.registration_complete_keyboard()
     )
-
-    await call.message.edit_text(text, reply_markup=complete_kb)
     await call.answer()
     await state.clear()
 
 
+def profile_view(user_data, back: bool = False):
+    """Текст и клавиатура профиля; `back` — кнопка «Назад» к экрану после регистрации."""
+    _, _, first_name, last_name, _, position, department, frequency, *_ = user_data
+    text = templates.render(
+        "profile",
+        first_name=first_name,
+        last_name=last_name,
+        position=position,
+        department=department,
+        frequency=templates.frequency_label(frequency or 1),
+        status=templates.render("status_active" if user_data[9] else "status_inactive"),
+    )
+    return text, templates.profile_keyboard(back)
+
+
 @user_router.message(Command("profile"))
 async def cmd_profile(message: Message):
     user_id = message.from_user.id
-    user_data = db.get_user(user_id)
+    user_data = await db.get_user(user_id)
     if not user_data:
-        await message.answer(
-            "❌ Вы не зарегистрированы в системе или были удалены.\n"
-            "Используйте /start для регистрации."
-        )
+        await message.answer(templates.render("not_registered"))
         return
-    _, _, first_name, last_name, full_name, position, department, *_ = user_data
-
-    profile_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="✏️ Обновить данные", callback_data="start_registration"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="❌ Отписаться", callback_data="confirm_unsubscribe"
-                )
-            ],
-        ]
-    )
-
-    text = (
-        f"{hbold('👤 Ваш профиль:')}\n\n"
-        f"👤 {hbold('Имя:')}  {(first_name)} {(last_name)}\n"
-        f"💼 {hbold('Должность:')} {position}\n"
-        f"🏢 {hbold('Отдел:')} {department}\n"
-        f"Статус: {'Активный ✅' if user_data[9] else 'Неактивный ❌'}\n\n"
-        "Используйте кнопки ниже для управления профилем:"
-    )
-
+    text, profile_kb = profile_view(user_data)
     await message.answer(text, reply_markup=profile_kb)
 
 
 @user_router.callback_query(F.data == "confirm_unsubscribe")
 async def on_confirm_unsubscribe(call: CallbackQuery):
     user_id = call.from_user.id
-    db.deactivate_user(user_id)  # Предполагается, что такой метод существует
+    await db.deactivate_user(user_id)  # Предполагается, что такой метод существует
 
-    text = (
-        f"{hbold('👋 Вы отписались от Random Coffee')}\n\n"
-        "Жаль, что вы уходите! Если захотите вернуться, "
-        "используйте команду /start"
-    )
-
-    await call.message.edit_text(text)
+    await call.message.edit_text(templates.render("unsubscribed"))
     await call.answer()
 
 
@@ -342,30 +257,16 @@ async def on_cancel_unsubscribe(call: CallbackQuery):
 async def on_cancel_action(call: CallbackQuery, state: FSMContext):
     await state.clear()
     await call.message.edit_text(
-        "❌ Действие отменено. Используйте /start когда будете готовы.",
-        reply_markup=get_start_kb(),
+        templates.render("action_cancelled"),
+        reply_markup=templates.start_keyboard(),
     )
     await call.answer()
 
 
 @user_router.callback_query(F.data == "help_info")
 async def on_help_info(call: CallbackQuery):
-    help_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_main")]
-        ]
-    )
-
     await call.message.edit_text(
-        f"{hbold('Доступные команды:')}\n\n"
-        "/start - Начать работу с ботом\n"
-        "/profile - Просмотреть/изменить профиль\n"
-        "/help - Показать эту справку\n\n"
-        f"{hbold('О сервисе:')}\n"
-        "Random Coffee - это возможность познакомиться "
-        "с коллегами в неформальной обстановке.\n\n"
-        "По всем вопросам обращайтесь к администратору.",
-        reply_markup=help_kb,
+        templates.render("help"), reply_markup=templates.back_keyboard("back_to_main")
     )
     await call.answer()
 
@@ -374,59 +275,23 @@ async def on_help_info(call: CallbackQuery):
 async def on_back_to_main(call: CallbackQuery, state: FSMContext):
     await state.clear()
     user_id = call.from_user.id
-    existing_user = db.get_user(user_id)
+    existing_user = await db.get_user(user_id)
 
     if existing_user and existing_user[9]:  # is_active
-        text = (
-            f"С возвращением! Вы уже зарегистрированы в Random Coffee.\n"
-            f"Используйте /profile для просмотра или изменения данных."
-        )
-        await call.message.edit_text(text)
+        await call.message.edit_text(templates.render("welcome_back"))
         await call.answer()
         return
 
-    text = (
-        "Привет! 👋 Добро пожаловать в Random Coffee!\n"
-        "Это корпоративный формат, в котором сотрудники из разных команд встречаются случайным образом — чтобы просто пообщаться, познакомиться, поделиться опытом или обсудить что угодно.\n"
-        "Мы формируем пары, и вы вместе идёте на кофе, обед или встречу после работы — выбор места по желанию.\n"
-        "🎯 Цель — налаживать связи внутри компании, узнавать новое и напоминать друг другу: мы — не только роли и функции, мы — команда.\n\n"
-        "📝 Как это работает:\n\n"
-        "1. Все желающие регистрируются и выбирают частоту участия в жеребьевке (раз в неделю или раз в месяц)\n"
-        "2. Назначается дата жеребьёвки\n"
-        "3. В назначенную дату тебе приходит имя партнера и как с ним можно связаться\n"
-        "4. Вы договариваетесь о встрече на этой неделе\n"
-        "5. Пьёте кофе, обсуждаете интересные темы.\n\n"
-        "🤝 Надеемся, это будет полезно и приятно.\n"
-        "Хорошей беседы и вкусного кофе ☕\n\n"
-        "Нажми кнопку ниже, чтобы присоединиться:"
-    )
-    await call.message.edit_text(text, reply_markup=get_start_kb())
+    text = templates.render("welcome")
+    await call.message.edit_text(text, reply_markup=templates.start_keyboard())
     await call.answer()
 
 
 @user_router.callback_query(F.data == "paired_confirmed")
 async def on_paired_confirmed(call: CallbackQuery):
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="☕ Продолжить участие", callback_data="continue_participation"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="❌ Отказаться от участия", callback_data="confirm_unsubscribe"
-                )
-            ],
-        ]
-    )
-
-    text = (
-        "🎉 Отлично, встреча назначена!\n\n"
-        "Хотите продолжить участие в Random Coffee на следующей неделе?"
+    await call.message.edit_text(
+        templates.render("meeting_agreed"), reply_markup=templates.continue_keyboard()
     )
-
-    await call.message.edit_text(text, reply_markup=kb)
     await call.answer()
 
 
@@ -439,47 +304,58 @@ async def on_paired_confirmed(call: CallbackQuery):
 async def on_continue_participation(call: CallbackQuery):
     user_id = call.from_user.id
     try:
-        updated = db.set_active(user_id, True)
+        updated = await db.set_active(user_id, True)
         if updated:
             logging.info(f"[CONTINUE] user_id={user_id} -> is_active=1 (updated)")
         else:
             logging.warning(f"[CONTINUE] user_id={user_id} -> update failed (no rows)")
     except Exception as e:
         logging.exception(f"set_active failed for user_id={user_id}: {e}")
-    text = "✅ Вы продолжите участие в Random Coffee! Новая пара будет в следующий понедельник."
-    await call.message.edit_text(text)
+    await call.message.edit_text(templates.render("participation_continued"))
     await call.answer()
 
 
-# Отправка напоминания после создания пары
-async def send_reminder_after_pairing(
-    user_id: int, partner_name: str, partner_contact: str, bot
-):
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="✉️ Написать напарнику",
-                    url=f"https://t.me/{partner_contact.lstrip('@')}",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="✅ Договорились", callback_data="paired_confirmed"
-                )
-            ],
-        ]
-    )
+# Напоминание после создания пары
+def build_reminder_after_pairing(partners: list):
+    """
+    Текст и клавиатура напоминания; partners — [{"full_name", "username"}, ...]
+    (двое для группы из трёх). Кнопка чата только если есть username.
+    """
+    return templates.reminder_after_pairing(partners), templates.partner_keyboard(partners)
 
-    text = (
-        "👋 Привет!\n"
-        "Напоминаем, что ты участвуешь в Random Coffee на этой неделе ☕\n\n"
-        f"Уже договорился(ась) со своим напарником {partner_name}? Если ещё нет — напиши, это займёт меньше минуты :)\n\n"
-        "Цель — просто пообщаться. Узнать лучше своего коллегу: чем он занимается, что делает на работе, чем увлекается в свободное время.\n\n"
-        "Удачной встречи!"
-    )
 
-    await bot.send_message(chat_id=user_id, text=text, reply_markup=kb)
+# Разбор очереди напоминаний (используется планировщиком в main.py)
+async def send_due_reminders(bot):
+    """
+    Отправляет все наступившие напоминания из очереди в БД порциями
+    через общий отправитель и удаляет обработанные записи.
+    """
+    sent = 0
+    failed = 0
+    while True:
+        due = await db.get_due_reminders(REMINDER_BATCH_SIZE)
+        if not due:
+            break
+        deliveries = []
+        for reminder_id, user_id, partners in due:
+            text, kb = build_reminder_after_pairing(
+                [
+                    {"full_name": full_name, "username": username}
+                    for full_name, username in partners
+                ]
+            )
+            delivery = sender.message(bot, user_id, text, reply_markup=kb)
+            delivery.key = reminder_id
+            deliveries.append(delivery)
+
+        results = await sender.sender.deliver(deliveries)
+        sent += sum(1 for res in results.values() if res.ok)
+        failed += sum(1 for res in results.values() if not res.ok)
+        # Неудачные тоже удаляем: отправитель уже исчерпал повторные попытки
+        await db.delete_reminders(list(results))
+
+    if sent or failed:
+        logging.info(f"Due reminders processed: sent={sent}, failed={failed}")
 
 
 # Еженедельное напоминание (используется планировщиком в main.py)
@@ -491,55 +367,35 @@ async def send_weekly_reminders(bot):
       • «✅ Договорились» (фиксирует продолжение участия)
     """
     logging.info("Starting weekly reminders job…")
+    text = templates.render("weekly_reminder")
+    total = 0
+    failed = 0
+
+    async def flush(deliveries):
+        nonlocal total, failed
+        results = await sender.sender.deliver(deliveries)
+        total += len(results)
+        failed += sum(1 for res in results.values() if not res.ok)
+
     try:
-        users = db.get_all_active_users()  # [(user_id, username, ... , is_active), ...]
+        # Один запрос на всех: (user_id, напарник) читаются потоком порциями
+        deliveries = []
+        async for user_id, partners in db.get_current_partners_bulk():
+            # Клавиатура без username-кнопок общая для всех получателей
+            kb = templates.partner_keyboard(partners)
+            deliveries.append(sender.message(bot, user_id, text, reply_markup=kb))
+            if len(deliveries) >= REMINDER_BATCH_SIZE:
+                await flush(deliveries)
+                deliveries = []
+        if deliveries:
+            await flush(deliveries)
     except Exception as e:
-        logging.exception(f"get_all_active_users failed: {e}")
-        users = []
+        logging.exception(f"Weekly reminders failed: {e}")
 
-    if not users:
+    if not total:
         logging.info("No active users for weekly reminders.")
         return
-
-    for row in users:
-        user_id = row[0]
-        partner = db.get_current_partner(user_id)
-        # Build keyboard depending on partner existence and username
-        kb_buttons = []
-        if partner and partner.get("username"):
-            partner_username = partner["username"].lstrip("@")
-            kb_buttons.append(
-                [
-                    InlineKeyboardButton(
-                        text="✉️ Написать напарнику",
-                        url=f"https://t.me/{partner_username}",
-                    )
-                ]
-            )
-        # Always add the "Договорились" button
-        kb_buttons.append(
-            [
-                InlineKeyboardButton(
-                    text="✅ Договорились", callback_data="paired_confirmed"
-                )
-            ]
-        )
-        kb = InlineKeyboardMarkup(inline_keyboard=kb_buttons)
-        text = (
-            "👋 Привет!\n"
-            "Напоминаем, что ты участвуешь в Random Coffee на этой неделе ☕\n\n"
-            "Если ещё не договорился(ась) о встрече — напиши своему напарнику, это займёт меньше минуты :)\n\n"
-            "Цель — просто пообщаться. Узнать лучше своего коллегу: чем он занимается, что делает на работе, чем увлекается в свободное время.\n\n"
-            "Удачной встречи!"
-        )
-        try:
-            await bot.send_message(chat_id=user_id, text=text, reply_markup=kb)
-            logging.info(f"Weekly reminder -> user_id={user_id}")
-        except Exception as e:
-            logging.exception(
-                f"Failed to send weekly reminder to user_id={user_id}: {e}"
-            )
-            continue
+    logging.info(f"Weekly reminders sent: total={total}, failed={failed}")
 
 
 # Handler: Открыть чат с напарником (по username)
@@ -547,25 +403,43 @@ async def send_weekly_reminders(bot):
 async def open_partner_chat(call: CallbackQuery):
     user_id = call.from_user.id
     try:
-        partner = db.get_current_partner(user_id)
+        partners = await db.get_current_partners(user_id)
     except Exception as e:
-        logging.exception(f"get_current_partner failed for user_id={user_id}: {e}")
-        partner = None
+        logging.exception(f"get_current_partners failed for user_id={user_id}: {e}")
+        partners = []
 
-    if not partner or not partner.get("username"):
-        await call.answer(
-            "Партнёр ещё не назначен или у него нет username.", show_alert=True
-        )
+    partners = [p for p in partners if p.get("username")]
+    if not partners:
+        await call.answer(templates.render("no_partner_username"), show_alert=True)
         return
 
-    username = partner["username"].lstrip("@")
     kb = InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="✉️ Открыть чат", url=f"https://t.me/{username}")]
+            [
+                InlineKeyboardButton(
+                    text=templates.render("btn_open_chat")
+                    if len(partners) == 1
+                    else templates.render(
+                        "btn_open_chat_named", name=p.get("full_name") or p["username"]
+                    ),
+                    url=f"https://t.me/{p['username'].lstrip('@')}",
+                )
+            ]
+            for p in partners
         ]
     )
+    names = ", ".join(
+        templates.render(
+            "partner_with_contact",
+            name=p.get("full_name") or templates.render("no_name"),
+            username=p["username"].lstrip("@"),
+        )
+        for p in partners
+    )
     await call.message.answer(
-        f"Ваш напарник на этой неделе: {partner.get('full_name','Без имени')} (@{username})",
+        templates.render(
+            "current_partner" if len(partners) == 1 else "current_partners", names=names
+        ),
         reply_markup=kb,
     )
     await call.answer()
@@ -574,73 +448,55 @@ async def open_partner_chat(call: CallbackQuery):
 @user_router.callback_query(F.data == "profile_info")
 async def on_profile_info(call: CallbackQuery):
     user_id = call.from_user.id
-    user_data = db.get_user(user_id)
+    user_data = await db.get_user(user_id)
 
     if not user_data:
-        await call.message.edit_text(
-            "❌ Вы еще не зарегистрированы в системе!\n"
-            "Используйте /start для регистрации."
-        )
+        await call.message.edit_text(templates.render("not_registered_yet"))
         await call.answer()
         return
 
-    # Unpack fields
-    _, _, first_name, last_name, full_name, position, department, *_ = user_data
+    text, profile_kb = profile_view(user_data, back=True)
+    await call.message.edit_text(text, reply_markup=profile_kb)
+    await call.answer()
 
-    profile_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="✏️ Обновить данные", callback_data="start_registration"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="❌ Отписаться", callback_data="confirm_unsubscribe"
-                )
-            ],
-            [InlineKeyboardButton(text="⬅️ Назад", callback_data="after_registration")],
-        ]
-    )
 
-    text = (
-        f"{hbold('👤 Ваш профиль:')}\n\n"
-        f"👤 {hbold('Имя:')}  {(first_name)} {(last_name)}\n"
-        f"💼 {hbold('Должность:')} {position}\n"
-        f"🏢 {hbold('Отдел:')} {department}\n"
-        f"Статус: {'Активный ✅' if user_data[9] else 'Неактивный ❌'}\n\n"
-        "Используйте кнопки ниже для управления профилем:"
+@user_router.callback_query(F.data == "profile_frequency")
+async def on_profile_frequency(call: CallbackQuery):
+    await call.message.edit_text(
+        templates.render("frequency_prompt"),
+        reply_markup=templates.frequency_keyboard("set_frequency", "profile_info"),
     )
+    await call.answer()
+
 
+@user_router.callback_query(F.data.startswith("set_frequency:"))
+async def on_set_frequency(call: CallbackQuery):
+    frequency = int(call.data.split(":")[1])
+    if frequency not in templates.FREQUENCY_CHOICES or not await db.set_frequency(
+        call.from_user.id, frequency
+    ):
+        await call.answer()
+        return
+    await call.answer(
+        templates.render("frequency_saved", frequency=templates.frequency_label(frequency))
+    )
+    user_data = await db.get_user(call.from_user.id)
+    text, profile_kb = profile_view(user_data, back=True)
     await call.message.edit_text(text, reply_markup=profile_kb)
-    await call.answer()
 
 
 # after_registration handler
 @user_router.callback_query(F.data == "after_registration")
 async def on_after_registration(call: CallbackQuery):
-    text = (
-        f"🎉 {hbold('Регистрация завершена!')}\n\n"
-        "Теперь вы участник Random Coffee!\n\n"
-        "Каждую неделю вы будете получать нового собеседника. "
-        "Первое знакомство запланировано на ближайший понедельник."
+    user_data = await db.get_user(call.from_user.id)
+    frequency = user_data[7] if user_data and user_data[7] else 1
+    text = templates.render(
+        "registration_complete", frequency=templates.frequency_label(frequency)
     )
 
-    complete_kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(text="ℹ️ Помощь", callback_data="help_info"),
-                InlineKeyboardButton(text="👤 Профиль", callback_data="profile_info"),
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🚪 Выйти из бота", callback_data="confirm_unsubscribe"
-                )
-            ],
-        ]
+    await call.message.edit_text(
+        text, reply_markup=templates.registration_complete_keyboard()
     )
-
-    await call.message.edit_text(text, reply_markup=complete_kb)
     await call.answer()
 
 
@@ -648,12 +504,7 @@ async def on_after_registration(call: CallbackQuery):
 @user_router.callback_query(F.data == "reactivate_user")
 async def on_reactivate_user(call: CallbackQuery):
     user_id = call.from_user.id
-    db.reactivate_user(user_id)  # функция меняет is_active на True
+    await db.reactivate_user(user_id)  # функция меняет is_active на True
 
-    text = (
-        f"{hbold('🎉 Вы снова участвуете в Random Coffee!')}\n\n"
-        "На следующей неделе вы получите нового собеседника.\n\n"
-        "Используйте /profile для проверки и обновления данных."
-    )
-    await call.message.edit_text(text)
+    await call.message.edit_text(templates.render("reactivated"))
     await call.answer()
@@ -0,0 +1,112 @@
+"""
+Webhook module: serves Telegram updates over HTTP (aiohttp) instead of polling.
+
+Requests are checked against WEBHOOK_SECRET, acknowledged right away and fed
+to the dispatcher in background tasks; at most WEBHOOK_MAX_IN_FLIGHT updates
+are processed at once (further requests wait for a free slot).
+
+Local testing: run with BOT_MODE=webhook and POST a recorded update:
+    curl -X POST -H "Content-Type: application/json" \
+         -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \
+         -d @update.json http://localhost:8080/webhook
+"""
+
+import asyncio
+import logging
+import secrets
+from typing import Set
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from config import (
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_IN_FLIGHT,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+
+
+class WebhookHandler:
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        secret: str = WEBHOOK_SECRET,
+        max_in_flight: int = WEBHOOK_MAX_IN_FLIGHT,
+    ):
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        # Updates without the secret token (or with a wrong one) are rejected
+        if not self.secret or not secrets.compare_digest(
+            request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), self.secret
+        ):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self.bot}
+            )
+        except Exception as e:
+            logging.warning(f"Rejected malformed webhook update: {e}")
+            return web.Response(status=400)
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception as e:
+            logging.exception(f"Failed to process update {update.update_id}: {e}")
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Wait for updates that are still being processed."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def build_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    handler = WebhookHandler(dp, bot)
+    app = web.Application()
+    app["webhook_handler"] = handler
+    app.router.add_post(WEBHOOK_PATH, handler.handle)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Serve updates until cancelled."""
+    app = build_app(dp, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    logging.info(f"Webhook server listening on {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    await dp.emit_startup(bot=bot)
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logging.info(f"Webhook registered at {WEBHOOK_URL}{WEBHOOK_PATH}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await app["webhook_handler"].close()
+        await dp.emit_shutdown(bot=bot)